@@ -2,51 +2,125 @@
 """
 Stream users from database using generator
 """
-import mysql.connector
-from mysql.connector import Error
+import time
+from mysql.connector import Error, errors
+from db_pool import close_stream, connect_to_prodev
+from row_formats import USER_COLUMNS, check_format, convert_batch
 
-def connect_to_prodev():
-    """Connects to the ALX_prodev database"""
+def stream_users(read_ahead=100, row_format='dict'):
+    """
+    Generator that streams rows from user_data table one by one
+    Uses yield to implement generator pattern
+
+    Rows are read through an unbuffered cursor, read_ahead rows per
+    fetchmany call, so the client only ever holds one block of the
+    result set and the first row arrives before the scan finishes.
+    row_format is 'dict', 'tuple' or 'record' (see row_formats).
+    """
+    yield from stream_rows(f"SELECT {', '.join(USER_COLUMNS)} FROM user_data",
+                           read_ahead=read_ahead, row_format=row_format)
+
+def stream_rows(query, params=(), read_ahead=100, row_format='dict'):
+    """
+    Generator that streams the rows of any user_data query
+    Same unbuffered fetchmany read as stream_users
+    """
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',      # Change as per your MySQL setup
-            password='',      # Change as per your MySQL setup
-            database='ALX_prodev'
-        )
-        return connection
+        yield from _iter_rows(query, params, read_ahead, row_format)
     except Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+        print(f"Error streaming users: {e}")
 
-def stream_users():
+def _iter_rows(query, params, read_ahead, row_format, connection=None):
     """
-    Generator that streams rows from user_data table one by one
-    Uses yield to implement generator pattern
+    stream_rows without the error handling: database errors propagate
+    The stream borrows its own connection unless one is given; either
+    way it is released when the stream ends.
     """
-    connection = connect_to_prodev()
+    check_format(row_format)
+    if connection is None:
+        connection = connect_to_prodev()
     if not connection:
-        return
+        raise errors.InterfaceError("Could not connect to ALX_prodev")
     
     cursor = None
+    exhausted = False
     try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM user_data")
+        cursor = connection.cursor(dictionary=row_format == 'dict',
+                                   buffered=False)
+        cursor.execute(query, params)
         
         # Only one loop as required
         while True:
-            row = cursor.fetchone()
-            if row is None:
+            rows = cursor.fetchmany(read_ahead)
+            if not rows:
+                exhausted = True
                 break
-            yield row
+            yield from convert_batch(rows, cursor.column_names, row_format)
             
-    except Error as e:
-        print(f"Error streaming users: {e}")
     finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
+        close_stream(connection, cursor, exhausted)
+
+class ResumableUserStream:
+    """
+    Iterable over user_data in user_id order that survives lost connections
+    The user_id of the last row handed out is tracked; when the connection
+    drops, the scan reconnects with exponential backoff and continues
+    with user_id > that key, so no row is repeated or skipped. resumes
+    counts how many times that happened.
+    """
+
+    def __init__(self, read_ahead=100, row_format='dict', max_retries=5,
+                 backoff=0.5, max_backoff=30.0):
+        check_format(row_format)
+        self.read_ahead = read_ahead
+        self.row_format = row_format
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.last_user_id = None
+        self.resumes = 0
+        self.rows = 0
+
+    def _scan(self):
+        """Rows after last_user_id, from a fresh connection"""
+        select = f"SELECT {', '.join(USER_COLUMNS)} FROM user_data"
+        if self.last_user_id is None:
+            query, params = f"{select} ORDER BY user_id", ()
+        else:
+            query = f"{select} WHERE user_id > %s ORDER BY user_id"
+            params = (self.last_user_id,)
+        return _iter_rows(query, params, self.read_ahead, self.row_format)
+
+    def __iter__(self):
+        failures = 0
+        while True:
+            try:
+                for row in self._scan():
+                    self.last_user_id = (row['user_id']
+                                         if self.row_format == 'dict'
+                                         else row[0])
+                    self.rows += 1
+                    failures = 0
+                    yield row
+                return
+            except (errors.OperationalError, errors.InterfaceError) as e:
+                failures += 1
+                if failures > self.max_retries:
+                    raise
+                delay = min(self.backoff * 2 ** (failures - 1),
+                            self.max_backoff)
+                print(f"Lost connection while streaming users ({e}), "
+                      f"resuming after {self.last_user_id} in {delay:.1f}s")
+                time.sleep(delay)
+                self.resumes += 1
+
+def stream_users_resumable(read_ahead=100, row_format='dict', max_retries=5,
+                           backoff=0.5):
+    """
+    Resumable version of stream_users (see ResumableUserStream)
+    Rows come in user_id order; read .resumes for the resume count.
+    """
+    return ResumableUserStream(read_ahead, row_format, max_retries, backoff)
 
 if __name__ == "__main__":
     # Test the generator
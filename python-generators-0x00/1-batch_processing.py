@@ -2,69 +2,125 @@
 """
 Batch processing of large datasets
 """
-import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errors
+from db_pool import close_stream, connect_to_prodev
+from row_formats import USER_COLUMNS, check_format, convert_batch
 
-def connect_to_prodev():
-    """Connects to the ALX_prodev database"""
+# Lookup suffixes accepted by compile_filter, Django style (age__gt=25)
+LOOKUPS = {
+    'exact': "{} = %s",
+    'gt': "{} > %s",
+    'gte': "{} >= %s",
+    'lt': "{} < %s",
+    'lte': "{} <= %s",
+    # Explicit escape character: SQLite has no default one, and MySQL's
+    # backslash is disabled by NO_BACKSLASH_ESCAPES
+    'startswith': "{} LIKE %s ESCAPE '!'",
+}
+
+def _select_columns(columns):
+    """Builds the select list for a column projection"""
+    if columns is None:
+        return "*"
+    unknown = [column for column in columns if column not in USER_COLUMNS]
+    if unknown or not columns:
+        raise ValueError(f"Invalid column projection: {columns}")
+    return ", ".join(columns)
+
+def compile_filter(where):
+    """
+    Compiles a filter into a parameterized WHERE clause
+    where maps lookups to values, e.g. {'age__gt': 25, 'name__in': [...]},
+    and all conditions are ANDed. Returns (clause, params); the clause is
+    empty when there is nothing to filter on.
+    """
+    if not where:
+        return "", ()
+
+    conditions = []
+    params = []
+    for lookup, value in where.items():
+        column, _, operator = lookup.partition('__')
+        operator = operator or 'exact'
+        if column not in USER_COLUMNS:
+            raise ValueError(f"Unknown user_data column: {column}")
+        if operator == 'in':
+            values = list(value)
+            if not values:
+                # Nothing can match an empty IN list
+                conditions.append("FALSE")
+                continue
+            placeholders = ", ".join(["%s"] * len(values))
+            conditions.append(f"{column} IN ({placeholders})")
+            params.extend(values)
+        elif operator in LOOKUPS:
+            if operator == 'startswith':
+                value = value.replace('!', '!!').replace('%', '!%')
+                value = value.replace('_', '!_') + '%'
+            conditions.append(LOOKUPS[operator].format(column))
+            params.append(value)
+        else:
+            raise ValueError(f"Unsupported lookup: {lookup}")
+    return "WHERE " + " AND ".join(conditions), tuple(params)
+
+def stream_users_in_batches(batch_size, columns=None, where=None,
+                            row_format='dict'):
+    """
+    Generator that fetches rows in batches
+    Each batch is filled by a single fetchmany call; columns limits
+    the query to the listed user_data columns instead of SELECT *.
+    where is pushed down to the server (see compile_filter), so only
+    matching rows are read and transferred.
+    row_format picks the batch layout: lists of 'dict', 'tuple' or
+    'record' rows, or 'columnar' lists per column (see row_formats).
+    """
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',      # Change as per your MySQL setup
-            password='',      # Change as per your MySQL setup
-            database='ALX_prodev'
-        )
-        return connection
+        yield from _iter_batches(batch_size, columns, where, row_format)
     except Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+        print(f"Error streaming users in batches: {e}")
 
-def stream_users_in_batches(batch_size):
+def _iter_batches(batch_size, columns=None, where=None, row_format='dict'):
     """
-    Generator that fetches rows in batches
+    stream_users_in_batches without the error handling
+    Database errors, including a failed connect, propagate to the caller.
     """
+    check_format(row_format, batched=True)
+    select_list = _select_columns(columns)
+    where_clause, params = compile_filter(where)
     connection = connect_to_prodev()
     if not connection:
-        return
+        raise errors.InterfaceError("Could not connect to ALX_prodev")
     
     cursor = None
+    exhausted = False
     try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM user_data")
+        cursor = connection.cursor(dictionary=row_format == 'dict')
+        cursor.execute(f"SELECT {select_list} FROM user_data {where_clause}",
+                       params)
         
         # First loop: batch processing
         while True:
-            batch = []
-            # Second loop: collecting batch
-            for _ in range(batch_size):
-                row = cursor.fetchone()
-                if row is None:
-                    break
-                batch.append(row)
-            
+            batch = cursor.fetchmany(batch_size)
             if not batch:
+                exhausted = True
                 break
                 
-            yield batch
+            yield convert_batch(batch, cursor.column_names, row_format)
             
-    except Error as e:
-        print(f"Error streaming users in batches: {e}")
     finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
+        close_stream(connection, cursor, exhausted)
 
-def batch_processing(batch_size):
+def batch_processing(batch_size, columns=None):
     """
     Processes each batch to filter users over age 25
     Uses only 3 loops as required
+    The age filter runs on the server against the idx_age index
     """
-    # Third loop: processing batches
-    for batch in stream_users_in_batches(batch_size):
+    # Second loop: processing batches
+    for batch in stream_users_in_batches(batch_size, columns,
+                                         where={'age__gt': 25}):
         for user in batch:
-            if user['age'] > 25:
-                print(user)
+            print(user)
 
 if __name__ == "__main__":
     batch_processing(50)
\ No newline at end of file
@@ -2,45 +2,184 @@
 """
 Lazy loading paginated data using generators
 """
-import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errors
+from background import read_ahead
+from db_pool import connect_to_prodev
 
-def connect_to_prodev():
-    """Connects to the ALX_prodev database"""
-    try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',      # Change as per your MySQL setup
-            password='',      # Change as per your MySQL setup
-            database='ALX_prodev'
-        )
-        return connection
-    except Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+# Columns lazy_pagination can seek on in keyset mode: the indexed ones
+# (user_id is the primary key, age has idx_age), so every page is an
+# index range read rather than a sort of the whole table
+SORT_KEYS = ('user_id', 'age')
+
+def _keyset_query(page_size, last_key, sort_key):
+    """Builds the seek query for the page that follows last_key"""
+    if sort_key not in SORT_KEYS:
+        raise ValueError(f"Unsupported sort key: {sort_key}")
+
+    # Non-unique keys are made unique with user_id as a tie-breaker
+    order_by = "user_id" if sort_key == 'user_id' else f"{sort_key}, user_id"
+    if last_key is None:
+        return (f"SELECT * FROM user_data ORDER BY {order_by} LIMIT %s",
+                (page_size,))
+
+    if sort_key == 'user_id':
+        where = "user_id > %s"
+        params = (last_key,)
+    else:
+        where = f"{sort_key} > %s OR ({sort_key} = %s AND user_id > %s)"
+        params = (last_key[0], last_key[0], last_key[1])
+    return (f"SELECT * FROM user_data WHERE {where} "
+            f"ORDER BY {order_by} LIMIT %s", params + (page_size,))
+
+def _page_key(row, sort_key):
+    """Returns the keyset position of a row for the given sort key"""
+    if sort_key == 'user_id':
+        return row['user_id']
+    return (row[sort_key], row['user_id'])
+
+class Paginator:
+    """
+    Fetches pages over one connection held for a whole walk
+    The connection comes from the shared db_pool pool, or from pool
+    (anything with get_connection(), e.g. a db_pool.ConnectionPool)
+    when given one.
+    A connection dropped by the server is reopened and the page replayed.
+    """
+
+    def __init__(self, pool=None, retries=1):
+        self.pool = pool
+        self.retries = retries
+        self.connection = None
+        self.connects = 0
+        self.round_trips = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def stats(self):
+        """Connects and round-trips used so far"""
+        return {'connects': self.connects, 'round_trips': self.round_trips}
+
+    def _connect(self):
+        if self.pool is not None:
+            self.connection = self.pool.get_connection()
+        else:
+            self.connection = connect_to_prodev()
+        if self.connection is None:
+            raise errors.InterfaceError("Could not connect to ALX_prodev")
+        self.connects += 1
+
+    def close(self):
+        """Releases the connection (returns it to the pool if pooled)"""
+        if self.connection is None:
+            return
+        try:
+            self.connection.close()
+        except Error:
+            pass
+        self.connection = None
+
+    def _discard(self):
+        """Drops a broken connection instead of returning it for reuse"""
+        try:
+            self.connection.shutdown()
+        except Error:
+            pass
+        self.close()
+
+    def fetch(self, query, params=()):
+        """Runs query and returns all its rows as dictionaries"""
+        attempt = 0
+        while True:
+            if self.connection is None:
+                self._connect()
+            try:
+                cursor = self.connection.cursor(dictionary=True)
+                try:
+                    cursor.execute(query, params)
+                    self.round_trips += 1
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
+            except (errors.OperationalError, errors.InterfaceError):
+                # Server went away: drop the connection and replay the page
+                self._discard()
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+
+    def paginate_users(self, page_size, offset):
+        """Fetch the page of users at offset, in user_id order"""
+        return self.fetch("SELECT * FROM user_data ORDER BY user_id "
+                          "LIMIT %s OFFSET %s", (page_size, offset))
+
+    def paginate_users_after(self, page_size, last_key=None,
+                             sort_key='user_id'):
+        """Fetch the page of users that follows last_key"""
+        return self.fetch(*_keyset_query(page_size, last_key, sort_key))
 
 def paginate_users(page_size, offset):
     """Fetch paginated users from database"""
-    connection = connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return rows
-
-def lazy_pagination(page_size):
+    with Paginator() as paginator:
+        return paginator.paginate_users(page_size, offset)
+
+def paginate_users_after(page_size, last_key=None, sort_key='user_id'):
+    """
+    Fetch the page of users that follows last_key (keyset pagination)
+    Seeks on the sort key index instead of skipping rows with OFFSET
+    """
+    with Paginator() as paginator:
+        return paginator.paginate_users_after(page_size, last_key, sort_key)
+
+def lazy_pagination(page_size, keyset=False, sort_key='user_id',
+                    paginator=None, prefetch=0):
     """
     Generator that implements lazy pagination
     Only one loop as required
+
+    With keyset=True pages continue from the last sort_key seen
+    (WHERE key > last key) instead of using OFFSET. sort_key must be
+    one of SORT_KEYS, which are indexed, so each page is a short index
+    range read and costs the same however deep the walk goes. Ordered
+    by user_id it yields the same pages as the OFFSET walk, which is
+    also ordered by user_id.
+
+    The whole walk shares one connection. Pass a Paginator to draw
+    it from a pool or to read its connect/round-trip counts afterwards.
+
+    prefetch > 0 fetches up to that many pages ahead in a background
+    thread, overlapping database latency with the caller's processing.
+    Memory stays bounded by about (prefetch + 2) pages.
     """
+    if prefetch:
+        yield from read_ahead(lambda: lazy_pagination(
+            page_size, keyset, sort_key, paginator), prefetch)
+        return
+
+    owned = paginator is None
+    if owned:
+        paginator = Paginator()
+
     offset = 0
-    while True:
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
-        yield page
-        offset += page_size
+    last_key = None
+    try:
+        while True:
+            if keyset:
+                page = paginator.paginate_users_after(page_size, last_key,
+                                                      sort_key)
+            else:
+                page = paginator.paginate_users(page_size, offset)
+            if not page:
+                break
+            yield page
+            offset += page_size
+            last_key = _page_key(page[-1], sort_key)
+    finally:
+        if owned:
+            paginator.close()
 
 if __name__ == "__main__":
     # Test the pagination
@@ -2,22 +2,8 @@
 """
 Memory-efficient aggregation using generators
 """
-import mysql.connector
 from mysql.connector import Error
-
-def connect_to_prodev():
-    """Connects to the ALX_prodev database"""
-    try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',      # Change as per your MySQL setup
-            password='',      # Change as per your MySQL setup
-            database='ALX_prodev'
-        )
-        return connection
-    except Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+from db_pool import close_stream, connect_to_prodev
 
 def stream_user_ages():
     """
@@ -29,6 +15,7 @@ def stream_user_ages():
         return
     
     cursor = None
+    exhausted = False
     try:
         cursor = connection.cursor()
         cursor.execute("SELECT age FROM user_data")
@@ -36,16 +23,45 @@ def stream_user_ages():
         while True:
             row = cursor.fetchone()
             if row is None:
+                exhausted = True
                 break
             yield float(row[0])
             
     except Error as e:
         print(f"Error streaming ages: {e}")
     finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
+        close_stream(connection, cursor, exhausted)
+
+def stream_user_age_chunks(chunk_size=10000):
+    """
+    Generator that yields user ages as NumPy float64 arrays
+    Each array is filled from one fetchmany block of chunk_size rows,
+    so aggregations can run vectorized per chunk with bounded memory.
+    Needs numpy.
+    """
+    import numpy as np
+
+    connection = connect_to_prodev()
+    if not connection:
+        return
+    
+    cursor = None
+    exhausted = False
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT age FROM user_data")
+        
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                exhausted = True
+                break
+            yield np.array(rows, dtype=np.float64).reshape(-1)
+            
+    except Error as e:
+        print(f"Error streaming ages: {e}")
+    finally:
+        close_stream(connection, cursor, exhausted)
 
 def calculate_average_age():
     """
@@ -65,5 +81,41 @@ def calculate_average_age():
     else:
         print("No users found")
 
+def server_age_stats():
+    """
+    Count, mean, variance, min and max computed by the server
+    Only one row crosses the wire instead of every age.
+    """
+    connection = connect_to_prodev()
+    if not connection:
+        return None
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(age), AVG(age), VAR_POP(age), "
+                       "MIN(age), MAX(age) FROM user_data")
+        count, mean, variance, minimum, maximum = cursor.fetchone()
+    except Error as e:
+        print(f"Error aggregating ages: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+    def as_float(value):
+        return None if value is None else float(value)
+
+    variance = as_float(variance) or 0.0
+    return {
+        'count': count,
+        'mean': as_float(mean),
+        'variance': variance,
+        'stdev': variance ** 0.5,
+        'min': as_float(minimum),
+        'max': as_float(maximum),
+    }
+
 if __name__ == "__main__":
     calculate_average_age()
\ No newline at end of file
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""
+Asyncio versions of the user generators
+"""
+import asyncio
+import threading
+
+from background import DONE, Failure, batched, produce
+
+users = __import__('0-stream_users')
+batches = __import__('1-batch_processing')
+pages = __import__('2-lazy_paginate')
+
+async def _offload(make_generator, maxsize, block_size=None):
+    """
+    Runs a blocking generator in a worker thread and yields its items
+    Items pass through an asyncio.Queue of maxsize, so the thread blocks
+    (not the event loop) when the consumer falls behind. With block_size
+    the thread sends lists of that many items, which are unpacked on the
+    loop side, so the thread hand-off happens once per block rather than
+    once per item; maxsize then counts blocks. Closing the stream early
+    (aclose(), or contextlib.aclosing around the loop) stops the thread
+    and closes the generator.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        if stop.is_set():
+            return False
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        return True
+
+    def run():
+        source = make_generator()
+        if block_size:
+            source = batched(source, block_size)
+        try:
+            produce(source, put)
+        except RuntimeError:
+            # The event loop is gone; nobody is left to consume
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is DONE:
+                break
+            if isinstance(item, Failure):
+                raise item.error
+            if block_size:
+                for row in item:
+                    yield row
+            else:
+                yield item
+    finally:
+        stop.set()
+        # Free a slot so a producer blocked on a full queue can see stop
+        while not queue.empty():
+            queue.get_nowait()
+
+def astream_users(read_ahead=100, maxsize=10):
+    """
+    Async generator over user_data rows (see stream_users)
+    Rows cross from the worker thread in blocks of read_ahead, one per
+    fetchmany call; at most maxsize blocks wait in the queue.
+    """
+    return _offload(lambda: users.stream_users(read_ahead), maxsize,
+                    read_ahead)
+
+def astream_users_in_batches(batch_size, columns=None, where=None, maxsize=4):
+    """Async generator over batches of users (see stream_users_in_batches)"""
+    return _offload(lambda: batches.stream_users_in_batches(
+        batch_size, columns, where), maxsize)
+
+def alazy_pagination(page_size, keyset=False, sort_key='user_id', maxsize=2):
+    """Async generator over pages of users (see lazy_pagination)"""
+    return _offload(lambda: pages.lazy_pagination(
+        page_size, keyset, sort_key), maxsize)
+
+async def _count(stream):
+    """Counts the items of an async stream"""
+    count = 0
+    async for _ in stream:
+        count += 1
+    return count
+
+async def main():
+    """Streams rows and pages concurrently without blocking the loop"""
+    rows, page_count = await asyncio.gather(
+        _count(astream_users()),
+        _count(alazy_pagination(100, keyset=True)),
+    )
+    print(f"Streamed {rows} users and {page_count} pages concurrently")
+
+if __name__ == "__main__":
+    asyncio.run(main())
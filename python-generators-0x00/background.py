@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""
+Background producer threads feeding bounded queues
+The read-ahead, parallel scan, pipeline buffer and asyncio streams all
+run a blocking generator in a thread and hand its items to a consumer.
+The producer ends its output with DONE, or with a Failure carrying the
+exception the source raised, so the consumer can re-raise it.
+"""
+import queue
+import threading
+
+DONE = object()
+
+class Failure:
+    """Carries an exception raised in a producer thread to the consumer"""
+
+    def __init__(self, error):
+        self.error = error
+
+def blocking_put(out, stop, poll=0.1):
+    """
+    put function for produce over a queue.Queue
+    Waits for room in out, giving up (returning False) once stop is set,
+    so a producer never stays blocked after the consumer has left.
+    """
+    def put(item):
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=poll)
+                return True
+            except queue.Full:
+                continue
+        return False
+    return put
+
+def produce(source, put):
+    """
+    Producer thread body: hands every item of source to put, then DONE
+    put returns False when the consumer is gone, which ends the loop.
+    An exception from source is handed over as a Failure instead of DONE.
+    source is closed in every case, releasing its connection.
+    """
+    try:
+        for item in source:
+            if not put(item):
+                return
+        put(DONE)
+    except Exception as e:
+        put(Failure(e))
+    finally:
+        close = getattr(source, 'close', None)
+        if close:
+            close()
+
+def drain(out):
+    """Consumer side: yields items from out until DONE, raising Failures"""
+    while True:
+        item = out.get()
+        if item is DONE:
+            return
+        if isinstance(item, Failure):
+            raise item.error
+        yield item
+
+def batched(items, size):
+    """Generator of lists of up to size consecutive items"""
+    batch = []
+    try:
+        for item in items:
+            batch.append(item)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        close = getattr(items, 'close', None)
+        if close:
+            close()
+
+def read_ahead(make_source, depth):
+    """
+    Yields the items of make_source() produced by a background thread
+    At most depth items wait in the queue. make_source is called in the
+    thread. Closing the generator stops the thread after the item in
+    flight and closes the source.
+    """
+    out = queue.Queue(depth)
+    stop = threading.Event()
+    put = blocking_put(out, stop)
+    worker = threading.Thread(target=lambda: produce(make_source(), put),
+                              daemon=True)
+    worker.start()
+    try:
+        yield from drain(out)
+    finally:
+        stop.set()
+        worker.join()
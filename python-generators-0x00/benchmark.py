@@ -0,0 +1,443 @@
+#!/usr/bin/python3
+"""
+Benchmarks for the streaming generators
+Needs a seeded ALX_prodev database, e.g. ./benchmark.py batches 1000,
+except the suite, row formats and filter --rows, which load their own
+synthetic dataset:
+    ./benchmark.py suite --rows 100000 --backend sqlite --output bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from mysql.connector import Error
+
+import db_pool
+import generate_user_data
+import sqlite_backend
+
+users = __import__('0-stream_users')
+batches = __import__('1-batch_processing')
+pages = __import__('2-lazy_paginate')
+ages = __import__('4-stream_ages')
+stream_stats = __import__('stream_stats')
+parallel_scan = __import__('parallel_scan')
+
+CASE_TIMEOUT = 600
+
+def fetchone_batches(batch_size):
+    """Reference batch generator: one fetchone call per row, SELECT *"""
+    connection = batches.connect_to_prodev()
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM user_data")
+    exhausted = False
+    try:
+        while True:
+            batch = []
+            for _ in range(batch_size):
+                row = cursor.fetchone()
+                if row is None:
+                    break
+                batch.append(row)
+            if not batch:
+                exhausted = True
+                break
+            yield batch
+    finally:
+        db_pool.close_stream(connection, cursor, exhausted)
+
+def server_bytes_sent():
+    """Bytes the server has sent to all clients, or None if unavailable"""
+    connection = batches.connect_to_prodev()
+    if not connection:
+        return None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Bytes_sent'")
+        row = cursor.fetchone()
+        cursor.close()
+        return int(row[1])
+    except Error:
+        return None
+    finally:
+        connection.close()
+
+def measure(label, stream):
+    """Drains a batch stream and reports rows/sec and bytes transferred"""
+    bytes_before = server_bytes_sent()
+    start = time.perf_counter()
+    rows = 0
+    for batch in stream:
+        rows += len(batch)
+    elapsed = time.perf_counter() - start
+    bytes_after = server_bytes_sent()
+
+    transferred = None
+    if bytes_before is not None and bytes_after is not None:
+        transferred = bytes_after - bytes_before
+    return {
+        'label': label,
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'bytes': transferred,
+    }
+
+def bench_batches(batch_size=1000, columns=('user_id', 'age')):
+    """Compares the fetchone batcher with fetchmany, with or without columns"""
+    results = [
+        measure("fetchone, SELECT *", fetchone_batches(batch_size)),
+        measure("fetchmany, SELECT *",
+                batches.stream_users_in_batches(batch_size)),
+        measure(f"fetchmany, {', '.join(columns)}",
+                batches.stream_users_in_batches(batch_size, columns)),
+    ]
+    for result in results:
+        transferred = result['bytes']
+        print(f"{result['label']:<28} {result['rows']:>10} rows "
+              f"{result['rows_per_sec']:>12.0f} rows/s "
+              f"{'n/a' if transferred is None else transferred:>12} bytes")
+    return results
+
+def timed(label, func):
+    """Runs func once and reports its wall time and result"""
+    start = time.perf_counter()
+    result = func()
+    return {'label': label, 'seconds': time.perf_counter() - start,
+            'result': result}
+
+def loop_average():
+    """The calculate_average_age loop, returning instead of printing"""
+    total = 0
+    count = 0
+    for age in ages.stream_user_ages():
+        total += age
+        count += 1
+    return total / count if count else None
+
+def bench_ages():
+    """Compares the average-age loop with streaming and pushed-down stats"""
+    results = [
+        timed("python loop (mean)", loop_average),
+        timed("one-pass stats + t-digest",
+              lambda: stream_stats.age_statistics(push_down=False)),
+        timed("numpy chunks + t-digest",
+              lambda: stream_stats.age_statistics(push_down=False,
+                                                  vectorized=True)),
+        timed("4 partitions in parallel",
+              lambda: parallel_scan.parallel_age_statistics(4)),
+        timed("server push-down",
+              lambda: stream_stats.age_statistics(percentiles=())),
+    ]
+    for result in results:
+        print(f"{result['label']:<28} {result['seconds']:>10.4f} s")
+    return results
+
+def age_at_selectivity(selectivity):
+    """Age threshold above which roughly selectivity of the users fall"""
+    connection = batches.connect_to_prodev()
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    total = cursor.fetchone()[0]
+    offset = min(int(total * (1 - selectivity)), max(total - 1, 0))
+    cursor.execute("SELECT age FROM user_data ORDER BY age LIMIT 1 OFFSET %s",
+                   (offset,))
+    row = cursor.fetchone()
+    cursor.close()
+    connection.close()
+    return row[0] if row else 0
+
+def python_filtered(batch_size, threshold):
+    """Filters in Python after streaming every row"""
+    count = 0
+    for batch in batches.stream_users_in_batches(batch_size):
+        for user in batch:
+            if user['age'] >= threshold:
+                count += 1
+    return count
+
+def pushed_down(batch_size, threshold):
+    """Filters on the server through compile_filter"""
+    count = 0
+    for batch in batches.stream_users_in_batches(
+            batch_size, where={'age__gte': threshold}):
+        count += len(batch)
+    return count
+
+def bench_filter(batch_size=1000, selectivities=(0.01, 0.1, 0.5, 1.0)):
+    """Compares Python-side filtering with push-down across selectivities"""
+    results = []
+    for selectivity in selectivities:
+        threshold = age_at_selectivity(selectivity)
+        python_side = timed("python", lambda: python_filtered(batch_size,
+                                                              threshold))
+        server_side = timed("push-down", lambda: pushed_down(batch_size,
+                                                             threshold))
+        speedup = (python_side['seconds'] / server_side['seconds']
+                   if server_side['seconds'] else 0.0)
+        print(f"selectivity {selectivity:>5.0%} (age >= {threshold}): "
+              f"{server_side['result']:>10} rows "
+              f"python {python_side['seconds']:.4f} s, "
+              f"push-down {server_side['seconds']:.4f} s, "
+              f"speedup {speedup:.1f}x")
+        results.append({'selectivity': selectivity, 'python': python_side,
+                        'push_down': server_side, 'speedup': speedup})
+    return results
+
+def bench_filter_synthetic(rows=1000000, backend='sqlite', **kwargs):
+    """bench_filter over rows synthetic users in a scratch database"""
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_backend(backend, workdir)
+        load_synthetic(rows)
+        results = bench_filter(**kwargs)
+        db_pool.get_pool().close_all()
+    return results
+
+def load_synthetic(rows, chunk_size=10000):
+    """Replaces the contents of user_data with rows synthetic users"""
+    seed = __import__('seed')
+    connection = db_pool.connect_to_prodev()
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM user_data")
+    connection.commit()
+    cursor.close()
+    seed.insert_rows(connection,
+                     generate_user_data.generate_chunks(rows, chunk_size,
+                                                        seed=0),
+                     commit_every=chunk_size * 10, progress=False)
+    connection.close()
+
+def setup_backend(backend, workdir):
+    """
+    Points the shared pool at a scratch database for the suite
+    'sqlite' uses a file in workdir; 'mysql' uses ALX_prodev_bench so the
+    real ALX_prodev data is never touched.
+    """
+    if backend == 'sqlite':
+        path = os.path.join(workdir, 'user_data.sqlite3')
+        db_pool.configure_pool(connect=sqlite_backend.connect, database=path)
+        connection = db_pool.connect_to_prodev()
+        sqlite_backend.create_table(connection)
+        connection.close()
+    elif backend == 'mysql':
+        seed = __import__('seed')
+        connection = seed.connect_db()
+        cursor = connection.cursor()
+        cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev_bench")
+        cursor.close()
+        connection.close()
+        db_pool.configure_pool(database='ALX_prodev_bench')
+        connection = db_pool.connect_to_prodev()
+        seed.create_table(connection)
+        connection.close()
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+def suite_cases(sizes):
+    """(generator name, size, factory) for every generator and size"""
+    cases = []
+    for size in sizes:
+        cases.append(('stream_users', size,
+                      lambda size=size: users.stream_users(read_ahead=size)))
+        cases.append(('stream_users_in_batches', size,
+                      lambda size=size: batches.stream_users_in_batches(size)))
+        cases.append(('lazy_pagination', size,
+                      lambda size=size: pages.lazy_pagination(size)))
+        cases.append(('lazy_pagination_keyset', size,
+                      lambda size=size: pages.lazy_pagination(size,
+                                                              keyset=True)))
+    cases.append(('stream_user_ages', None, ages.stream_user_ages))
+    return cases
+
+def _run_case(factory, results):
+    """
+    Child process: drains one generator and reports its measurements
+    An exception is reported as {'error': ...} instead, so the parent
+    never waits for a result that will not come.
+    """
+    try:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        first_row = None
+        rows = 0
+        for item in factory():
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            rows += len(item) if isinstance(item, list) else 1
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except BaseException as e:
+        results.put({'error': f"{type(e).__name__}: {e}"})
+        return
+    results.put({
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'time_to_first_row': first_row,
+        'peak_rss_kb': rss_after,
+        'rss_growth_kb': rss_after - rss_before,
+    })
+
+def measure_case(factory, timeout=CASE_TIMEOUT, poll=1.0):
+    """
+    Runs one case in a forked process
+    A fresh process per case keeps ru_maxrss (peak RSS) from carrying over
+    between cases. If the child dies without reporting, or is still
+    running after timeout seconds, it is stopped and the result is
+    {'error': ...} so the suite moves on to the next case.
+    """
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    child = context.Process(target=_run_case, args=(factory, results))
+    child.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=poll)
+        except queue.Empty:
+            if not child.is_alive():
+                # The child may have reported just before exiting
+                try:
+                    result = results.get(timeout=poll)
+                except queue.Empty:
+                    result = {'error': "Case exited with code "
+                                       f"{child.exitcode} without a result"}
+            elif time.monotonic() > deadline:
+                child.terminate()
+                result = {'error': f"Case timed out after {timeout} s"}
+    child.join()
+    results.close()
+    return result
+
+def run_suite(rows=100000, backend='sqlite', sizes=(100, 1000, 10000),
+              output='bench.json', timeout=CASE_TIMEOUT):
+    """
+    Loads rows synthetic users and measures every generator
+    Writes rows/sec, time-to-first-row and peak RSS per generator and
+    page/batch size to output as JSON with sorted keys, so two runs can
+    be compared with a plain diff. A case that fails or runs longer than
+    timeout seconds is recorded with an 'error' entry instead.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_backend(backend, workdir)
+        load_synthetic(rows)
+        report = {
+            'backend': backend,
+            'rows': rows,
+            'python': platform.python_version(),
+            'results': [],
+        }
+        for name, size, factory in suite_cases(sizes):
+            result = measure_case(factory, timeout)
+            result.update({'generator': name, 'size': size})
+            report['results'].append(result)
+            if 'error' in result:
+                print(f"{name:<24} {str(size):>6} failed: {result['error']}")
+                continue
+            first_row = result['time_to_first_row'] or 0
+            print(f"{name:<24} {str(size):>6} {result['rows_per_sec']:>12.0f} "
+                  f"rows/s  first row {first_row:.4f} s "
+                  f" peak RSS {result['peak_rss_kb']} kB")
+        db_pool.get_pool().close_all()
+
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+        file.write("\n")
+    return report
+
+def _retained_rows(row_format, batch_size):
+    """All user rows in row_format, as the streamers hand them out"""
+    if row_format == 'columnar':
+        return list(batches.stream_users_in_batches(batch_size,
+                                                    row_format='columnar'))
+    return list(users.stream_users(batch_size, row_format=row_format))
+
+def bench_row_formats(rows=100000, backend='sqlite', batch_size=1000,
+                      formats=('dict', 'tuple', 'record', 'columnar')):
+    """
+    Memory and allocations per row for each row format
+    Loads rows synthetic users, then for each format keeps every streamed
+    row alive and reports the bytes and allocated blocks tracemalloc sees
+    per row, along with rows/sec. The strings inside the rows cost the
+    same in every format; the differences come from the row containers.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_backend(backend, workdir)
+        load_synthetic(rows)
+        for row_format in formats:
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            start = time.perf_counter()
+            retained = _retained_rows(row_format, batch_size)
+            elapsed = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+            stats = after.compare_to(before, 'filename')
+            size = sum(stat.size_diff for stat in stats)
+            blocks = sum(stat.count_diff for stat in stats)
+            result = {
+                'format': row_format,
+                'rows': rows,
+                'bytes_per_row': size / rows,
+                'blocks_per_row': blocks / rows,
+                'rows_per_sec': rows / elapsed if elapsed else 0.0,
+            }
+            results.append(result)
+            print(f"{row_format:<10} {result['bytes_per_row']:>8.1f} "
+                  f"bytes/row {result['blocks_per_row']:>6.2f} blocks/row "
+                  f"{result['rows_per_sec']:>12.0f} rows/s")
+            del retained
+        db_pool.get_pool().close_all()
+    return results
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "batches"
+    if command == "batches":
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        bench_batches(size)
+    elif command == "ages":
+        bench_ages()
+    elif command == "filter":
+        parser = argparse.ArgumentParser(prog="benchmark.py filter")
+        parser.add_argument('--rows', type=int,
+                            help="load this many synthetic users into a "
+                                 "scratch database instead of ALX_prodev")
+        parser.add_argument('--backend', choices=('sqlite', 'mysql'),
+                            default='sqlite')
+        args = parser.parse_args(sys.argv[2:])
+        if args.rows:
+            bench_filter_synthetic(args.rows, args.backend)
+        else:
+            bench_filter()
+    elif command == "suite":
+        parser = argparse.ArgumentParser(prog="benchmark.py suite")
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--backend', choices=('sqlite', 'mysql'),
+                            default='sqlite')
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[100, 1000, 10000])
+        parser.add_argument('--output', default='bench.json')
+        parser.add_argument('--timeout', type=float, default=CASE_TIMEOUT,
+                            help="seconds before a case is stopped")
+        args = parser.parse_args(sys.argv[2:])
+        run_suite(args.rows, args.backend, tuple(args.sizes), args.output,
+                  args.timeout)
+    elif command == "row-formats":
+        parser = argparse.ArgumentParser(prog="benchmark.py row-formats")
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--backend', choices=('sqlite', 'mysql'),
+                            default='sqlite')
+        args = parser.parse_args(sys.argv[2:])
+        bench_row_formats(args.rows, args.backend)
+    else:
+        print(f"Unknown benchmark: {command}")
@@ -0,0 +1,267 @@
+#!/usr/bin/python3
+"""
+Shared connection pool for the ALX_prodev generators
+"""
+import os
+import threading
+import time
+import weakref
+import mysql.connector
+from mysql.connector import Error, errors
+
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',      # Change as per your MySQL setup
+    'password': '',      # Change as per your MySQL setup
+    'database': 'ALX_prodev',
+}
+
+# Seconds connect_to_prodev waits for a free pool slot
+CONNECT_TIMEOUT = 30
+
+class PooledConnection:
+    """
+    A connection borrowed from a ConnectionPool
+    Behaves like the underlying connection, except that close() hands
+    it back to the pool and shutdown() drops it from the pool. One that
+    is garbage collected without either is dropped as well, so a leaked
+    borrow cannot hold its pool slot for good.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._finalizer = weakref.finalize(self, pool.discard, connection,
+                                           True)
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise errors.InterfaceError("Connection already returned to pool")
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Returns the connection to the pool"""
+        if self._connection is not None:
+            self._finalizer.detach()
+            self._pool.release(self._connection)
+            self._connection = None
+
+    def shutdown(self):
+        """Closes the connection without reusing it (e.g. unread results)"""
+        if self._connection is not None:
+            self._finalizer.detach()
+            self._pool.discard(self._connection, shutdown=True)
+            self._connection = None
+
+class ConnectionPool:
+    """
+    Thread-safe pool of MySQL connections
+    Holds at most max_size connections, closes ones idle longer than
+    idle_timeout seconds, pings idle connections on checkout and keeps
+    counters for connects, checkouts and time spent waiting for a slot.
+    connect opens a connection from the config keyword arguments and
+    defaults to mysql.connector.connect.
+    """
+
+    def __init__(self, max_size=10, idle_timeout=300, validate=True,
+                 connect=None, **config):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.validate = validate
+        self.connect = connect or mysql.connector.connect
+        self.config = dict(DB_CONFIG, **config)
+        self._idle = []
+        self._size = 0
+        self._lock = threading.Condition()
+        self._metrics = {
+            'connects': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'evicted': 0,
+            'discarded': 0,
+        }
+
+    def stats(self):
+        """Pool counters plus current size and idle count"""
+        with self._lock:
+            return dict(self._metrics, size=self._size, idle=len(self._idle))
+
+    def get_connection(self, timeout=None):
+        """
+        Borrows a connection, waiting up to timeout seconds for a free slot
+        Raises mysql.connector.errors.PoolError if none frees up in time.
+        """
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        waited = False
+        while True:
+            connection = None
+            with self._lock:
+                while True:
+                    self._evict_idle()
+                    if self._idle:
+                        connection = self._idle.pop()[0]
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            raise errors.PoolError(
+                                "No connection available in pool")
+                    waited = True
+                    self._lock.wait(remaining)
+
+            if connection is None:
+                connection = self._open()
+            elif self.validate and not self._is_alive(connection):
+                self.discard(connection)
+                continue
+            self._record_checkout(time.perf_counter() - start, waited)
+            return PooledConnection(self, connection)
+
+    def release(self, connection):
+        """Puts a connection back into the idle list"""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            self.discard(connection)
+            return
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+
+    def discard(self, connection, shutdown=False):
+        """Closes a connection and frees its slot"""
+        try:
+            if shutdown:
+                connection.shutdown()
+            else:
+                connection.close()
+        except Error:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._metrics['discarded'] += 1
+            self._lock.notify()
+
+    def close_all(self):
+        """Closes every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Error:
+                pass
+
+    def _open(self):
+        """Opens a new connection for a reserved slot"""
+        try:
+            connection = self.connect(**self.config)
+        except Error:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._metrics['connects'] += 1
+        return connection
+
+    def _is_alive(self, connection):
+        """Pings a connection taken from the idle list"""
+        try:
+            return connection.is_connected()
+        except Error:
+            return False
+
+    def _evict_idle(self):
+        """Closes connections idle past idle_timeout (lock must be held)"""
+        cutoff = time.monotonic() - self.idle_timeout
+        # The idle list is in release order, so stale entries come first
+        while self._idle and self._idle[0][1] < cutoff:
+            connection = self._idle.pop(0)[0]
+            self._size -= 1
+            self._metrics['evicted'] += 1
+            try:
+                connection.close()
+            except Error:
+                pass
+
+    def _record_checkout(self, wait, waited):
+        """Updates the checkout and wait-time counters"""
+        with self._lock:
+            self._metrics['checkouts'] += 1
+            if waited:
+                self._metrics['waits'] += 1
+                self._metrics['wait_seconds'] += wait
+                self._metrics['max_wait_seconds'] = max(
+                    self._metrics['max_wait_seconds'], wait)
+
+_pool = None
+_pool_pid = None
+_pool_settings = {}
+_pool_lock = threading.Lock()
+
+def configure_pool(**settings):
+    """
+    Replaces the process-wide pool with one built from settings
+    settings are ConnectionPool arguments, e.g. max_size=20 or
+    database='ALX_prodev_bench'. Idle connections of the old pool are closed.
+    """
+    global _pool, _pool_settings
+    with _pool_lock:
+        old_pool, _pool = _pool, None
+        _pool_settings = dict(settings)
+    if old_pool is not None:
+        old_pool.close_all()
+
+def get_pool():
+    """
+    Returns the process-wide pool, creating it on first use
+    A forked child gets a fresh pool instead of sharing its parent's sockets.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(**_pool_settings)
+            _pool_pid = os.getpid()
+        return _pool
+
+def connect_to_prodev(timeout=CONNECT_TIMEOUT):
+    """
+    Borrows a connection to the ALX_prodev database from the shared pool
+    Waits up to timeout seconds for a free slot; prints the error and
+    returns None if none frees up or the connection fails.
+    """
+    try:
+        return get_pool().get_connection(timeout)
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return None
+
+def close_stream(connection, cursor, exhausted):
+    """
+    Closes the cursor and connection of a streaming generator
+    An unbuffered result that was not read to the end cannot be closed
+    normally without draining it (cursor.close() raises "Unread result
+    found"), so the socket is shut down and the connection dropped from
+    the pool instead.
+    """
+    try:
+        if not exhausted:
+            connection.shutdown()
+            return
+        if cursor:
+            cursor.close()
+        connection.close()
+    except Error:
+        # Never keep the slot of a connection that failed to close cleanly
+        connection.shutdown()
@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+"""
+Membership indexes over existing user_ids for deduplicating seeds
+A BloomFilter answers "definitely new" or "possibly present" in bounded
+memory; a SortedIdSet answers exactly from a sorted file on disk. Either
+way only the possible duplicates need a database lookup.
+"""
+import hashlib
+import math
+import mmap
+import tempfile
+from bisect import bisect_left
+
+from external_sort import external_sort
+
+users = __import__('0-stream_users')
+
+ID_WIDTH = 36
+
+class BloomFilter:
+    """
+    Set membership with false positives but no false negatives
+    Sized for capacity items at the given false positive rate, e.g.
+    about 1.2 MB per million ids at 1%.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate)
+                            / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: every bit position from one 128-bit digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        """Adds a string"""
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(value))
+
+class _Records:
+    """Sequence view of the fixed-width records of a SortedIdSet"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer) // ID_WIDTH
+
+    def __getitem__(self, index):
+        start = index * ID_WIDTH
+        return self.buffer[start:start + ID_WIDTH]
+
+class SortedIdSet:
+    """
+    Exact set of ids stored sorted in fixed-width records on disk
+    Lookups are binary searches over a memory map, so only the pages
+    touched stay in memory. Ids longer than 36 bytes are not supported.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        file.seek(0, 2)
+        if file.tell():
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.map = b''
+        self.records = _Records(self.map)
+
+    @classmethod
+    def build(cls, ids, run_size=100000, tempdir=None):
+        """Sorts ids with external_sort and writes them, deduplicated"""
+        file = tempfile.TemporaryFile(dir=tempdir)
+        previous = None
+        block = []
+        for value in external_sort((cls._record(value) for value in ids),
+                                   run_size=run_size, tempdir=tempdir):
+            if value != previous:
+                block.append(value)
+                previous = value
+                if len(block) == 4096:
+                    file.write(b"".join(block))
+                    block = []
+        file.write(b"".join(block))
+        file.flush()
+        return cls(file)
+
+    @staticmethod
+    def _record(value):
+        record = value.encode()
+        if len(record) > ID_WIDTH:
+            raise ValueError(f"Id longer than {ID_WIDTH} bytes: {value}")
+        return record.ljust(ID_WIDTH)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, value):
+        record = self._record(value)
+        index = bisect_left(self.records, record)
+        return index < len(self.records) and self.records[index] == record
+
+    def close(self):
+        """Releases the memory map and deletes the file"""
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def existing_user_ids(read_ahead=10000):
+    """
+    Generator over every user_id already in user_data
+    Raises if the read fails, so an incomplete index is never used.
+    """
+    for row in users._iter_rows("SELECT user_id FROM user_data", (),
+                                read_ahead, 'tuple'):
+        yield row[0]
+
+def count_users(connection):
+    """Number of rows in user_data"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+def build_index(connection, exact=False, error_rate=0.01, run_size=100000):
+    """
+    Membership index over the user_ids in user_data
+    A BloomFilter sized from COUNT(*), or with exact=True a SortedIdSet.
+    """
+    if exact:
+        return SortedIdSet.build(existing_user_ids(), run_size)
+    bloom = BloomFilter(count_users(connection), error_rate)
+    for user_id in existing_user_ids():
+        bloom.add(user_id)
+    return bloom
+
+def confirm_existing(connection, user_ids):
+    """The subset of user_ids present in user_data, in one IN (...) query"""
+    if not user_ids:
+        return set()
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT user_id FROM user_data "
+                       f"WHERE user_id IN ({placeholders})", tuple(user_ids))
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+"""
+Streaming export of user_data to NDJSON, CSV or a columnar binary file
+    ./export_users.py users.ndjson.gz
+    ./export_users.py users.csv --format csv
+    ./export_users.py users.ucol.xz --format columnar --columns user_id age
+"""
+import argparse
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import struct
+import sys
+from array import array
+from decimal import Decimal
+from itertools import islice
+from operator import itemgetter
+
+from mysql.connector import Error
+
+from external_sort import external_sort
+
+batches = __import__('1-batch_processing')
+
+# Standard-library codecs; zstd is not in the standard library
+COMPRESSORS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+COLUMNAR_MAGIC = b'UCOL1\n'
+FLOAT_COLUMNS = ('age',)
+
+def _plain(value):
+    """JSON-friendly version of a column value"""
+    return float(value) if isinstance(value, Decimal) else value
+
+def ndjson_block(batch, columns):
+    """One JSON object per line"""
+    return "".join(
+        json.dumps({column: _plain(row[column]) for column in columns}) + "\n"
+        for row in batch).encode()
+
+def csv_block(batch, columns):
+    """CSV lines in the user_data.csv quoting style"""
+    text = io.StringIO()
+    writer = csv.writer(text, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    writer.writerows([[row[column] for column in columns] for row in batch])
+    return text.getvalue().encode()
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+def columnar_block(batch, columns):
+    """
+    One block of the columnar format
+    uint32 row count, then per column either float64 values or uint32
+    byte lengths followed by the concatenated UTF-8 strings, little-endian.
+    """
+    parts = [struct.pack('<I', len(batch))]
+    for column in columns:
+        if column in FLOAT_COLUMNS:
+            parts.append(_little_endian(
+                array('d', (float(row[column]) for row in batch))))
+        else:
+            encoded = [str(row[column]).encode() for row in batch]
+            parts.append(_little_endian(array('I', map(len, encoded))))
+            parts.append(b"".join(encoded))
+    return b"".join(parts)
+
+def _header(fmt, columns):
+    """Bytes written before the first block"""
+    if fmt == 'csv':
+        return csv_block([dict(zip(columns, columns))], columns)
+    if fmt == 'columnar':
+        schema = {'columns': list(columns),
+                  'types': ['float64' if column in FLOAT_COLUMNS else 'utf8'
+                            for column in columns]}
+        return COLUMNAR_MAGIC + json.dumps(schema).encode() + b"\n"
+    return b""
+
+FORMATS = {
+    'ndjson': ndjson_block,
+    'csv': csv_block,
+    'columnar': columnar_block,
+}
+
+def _open_output(path, compression, level):
+    """Binary output stream, compressed if requested"""
+    if compression is None:
+        return open(path, 'wb')
+    if compression not in COMPRESSORS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    if compression == 'xz':
+        return lzma.open(path, 'wb', preset=level)
+    return COMPRESSORS[compression](path, 'wb', compresslevel=level)
+
+def _sorted_batches(batch_stream, order_by, batch_size, run_size):
+    """Re-batches the rows of batch_stream in order_by order"""
+    rows = (row for batch in batch_stream for row in batch)
+    ordered = external_sort(rows, key=itemgetter(order_by), run_size=run_size)
+    while True:
+        batch = list(islice(ordered, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def export_users(path, fmt='ndjson', compression='auto', columns=None,
+                 where=None, batch_size=1000, buffer_size=1 << 20, level=6,
+                 order_by=None, run_size=100000):
+    """
+    Writes user_data to path without holding the table in memory
+    Rows are streamed in batches as by stream_users_in_batches (columns
+    and where are passed through). Encoded batches collect in a buffer of
+    at most buffer_size bytes that is written out, and flushed, whenever
+    it fills, so memory stays constant with table size.
+    compression='auto' picks gzip, bz2 or xz from the file extension.
+    order_by sorts the export by one of the columns with external_sort,
+    holding at most run_size rows in memory, instead of an ORDER BY on
+    the server. Returns the number of rows written.
+
+    The file is written as path + '.part' and renamed to path only once
+    every row has been read, so a database error never leaves a complete
+    looking export behind: the partial file is removed and the error
+    raised.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    compression = _compression_for(path, compression)
+    columns = tuple(columns or batches.USER_COLUMNS)
+    if order_by is not None and order_by not in columns:
+        raise ValueError(f"order_by must be an exported column: {order_by}")
+    batch_stream = batches._iter_batches(batch_size, columns, where)
+    if order_by is not None:
+        batch_stream = _sorted_batches(batch_stream, order_by, batch_size,
+                                       run_size)
+
+    partial = path + '.part'
+    try:
+        rows = _write_export(partial, batch_stream, fmt, compression, level,
+                             columns, buffer_size)
+    except BaseException:
+        batch_stream.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, path)
+    return rows
+
+def _write_export(path, batch_stream, fmt, compression, level, columns,
+                  buffer_size):
+    """Encodes every batch into path; returns the number of rows"""
+    encode = FORMATS[fmt]
+    rows = 0
+    with _open_output(path, compression, level) as output:
+        pending = [_header(fmt, columns)]
+        pending_bytes = len(pending[0])
+        for batch in batch_stream:
+            block = encode(batch, columns)
+            pending.append(block)
+            pending_bytes += len(block)
+            rows += len(batch)
+            if pending_bytes >= buffer_size:
+                output.write(b"".join(pending))
+                output.flush()
+                pending = []
+                pending_bytes = 0
+        if fmt == 'columnar':
+            # A zero-row block marks the end of the file
+            pending.append(struct.pack('<I', 0))
+        output.write(b"".join(pending))
+    return rows
+
+def _read_column(file, kind, count):
+    """Reads one column of count values from a columnar block"""
+    if kind == 'float64':
+        values = array('d')
+        values.frombytes(file.read(8 * count))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values.tolist()
+
+    lengths = array('I')
+    lengths.frombytes(file.read(4 * count))
+    if sys.byteorder == 'big':
+        lengths.byteswap()
+    data = file.read(sum(lengths))
+    values = []
+    offset = 0
+    for length in lengths:
+        values.append(data[offset:offset + length].decode())
+        offset += length
+    return values
+
+def _compression_for(path, compression):
+    """Resolves compression='auto' from the file extension"""
+    if compression != 'auto':
+        return compression
+    return next((codec for suffix, codec in EXTENSIONS.items()
+                 if path.endswith(suffix)), None)
+
+def read_columnar(path, compression='auto'):
+    """
+    Generator that yields each block of a columnar export
+    Each block is a dict mapping column names to lists of values.
+    """
+    opener = COMPRESSORS.get(_compression_for(path, compression), open)
+    with opener(path, 'rb') as file:
+        if file.readline() != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar user export")
+        schema = json.loads(file.readline())
+        while True:
+            (count,) = struct.unpack('<I', file.read(4))
+            if count == 0:
+                return
+            yield {column: _read_column(file, kind, count)
+                   for column, kind in zip(schema['columns'],
+                                           schema['types'])}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+    parser.add_argument('--compression', default='auto',
+                        choices=['auto', 'none'] + sorted(COMPRESSORS))
+    parser.add_argument('--columns', nargs='+', default=None)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--buffer-size', type=int, default=1 << 20)
+    parser.add_argument('--order-by', default=None)
+    args = parser.parse_args()
+    compression = None if args.compression == 'none' else args.compression
+    try:
+        written = export_users(args.path, args.format, compression,
+                               args.columns, batch_size=args.batch_size,
+                               buffer_size=args.buffer_size,
+                               order_by=args.order_by)
+    except Error as e:
+        print(f"Error exporting users: {e}")
+        sys.exit(1)
+    print(f"Exported {written} users to {args.path}")
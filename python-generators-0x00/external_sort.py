@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+External merge sort for streamed rows
+Sorts streams larger than memory by spilling sorted runs to temporary
+files and merging them with a heap, instead of a server-side ORDER BY.
+"""
+import heapq
+import pickle
+import tempfile
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+from row_formats import USER_COLUMNS, column_index
+
+users = __import__('0-stream_users')
+
+def _write_blocks(rows, spill, block_size):
+    """Appends rows to the spill file in pickled blocks; returns the run"""
+    start = spill.seek(0, 2)
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) == block_size:
+            pickle.dump(block, spill, pickle.HIGHEST_PROTOCOL)
+            block = []
+    if block:
+        pickle.dump(block, spill, pickle.HIGHEST_PROTOCOL)
+    return start, spill.tell()
+
+def _read_run(spill, start, end):
+    """
+    Generator over the rows of one run of the spill file
+    Runs share the file handle, so each read seeks to where this run
+    left off; only one block per run is in memory.
+    """
+    position = start
+    while position < end:
+        spill.seek(position)
+        block = pickle.load(spill)
+        position = spill.tell()
+        yield from block
+
+def _merge_runs(spill, runs, key, reverse):
+    return heapq.merge(*(_read_run(spill, start, end) for start, end in runs),
+                       key=key, reverse=reverse)
+
+def external_sort(rows, key=None, reverse=False, run_size=100000,
+                  max_runs=64, tempdir=None, block_size=1000):
+    """
+    Generator that yields rows sorted by key
+    At most run_size rows are held in memory: each full run is sorted
+    and spilled to a temporary file, then the runs are k-way merged,
+    reading them back block_size rows at a time. When there are more than
+    max_runs runs they are first merged in groups into a new file, which
+    bounds merge memory to max_runs blocks. Inputs that fit in one run
+    never touch the disk. The sort is stable, like sorted().
+    """
+    rows = iter(rows)
+    chunk = list(islice(rows, run_size))
+    chunk.sort(key=key, reverse=reverse)
+    if len(chunk) < run_size:
+        yield from chunk
+        return
+
+    spill = tempfile.TemporaryFile(dir=tempdir)
+    try:
+        runs = []
+        while chunk:
+            runs.append(_write_blocks(chunk, spill, block_size))
+            chunk = list(islice(rows, run_size))
+            chunk.sort(key=key, reverse=reverse)
+        del chunk
+
+        while len(runs) > max_runs:
+            # Each pass merges consecutive groups, keeping the sort stable
+            merged = tempfile.TemporaryFile(dir=tempdir)
+            runs = [_write_blocks(_merge_runs(spill, runs[i:i + max_runs],
+                                              key, reverse),
+                                  merged, block_size)
+                    for i in range(0, len(runs), max_runs)]
+            spill.close()
+            spill = merged
+
+        yield from _merge_runs(spill, runs, key, reverse)
+    finally:
+        spill.close()
+
+def sorted_users(order_by='age', reverse=False, run_size=100000,
+                 tempdir=None, **kwargs):
+    """
+    stream_users sorted by one column without an ORDER BY on the server
+    kwargs are passed to stream_users; order_by must be a column of the
+    rows it yields.
+    """
+    row_format = kwargs.get('row_format', 'dict')
+    if row_format == 'tuple':
+        key = itemgetter(column_index(USER_COLUMNS)[order_by])
+    elif row_format == 'record':
+        key = attrgetter(order_by)
+    else:
+        key = itemgetter(order_by)
+    return external_sort(users.stream_users(**kwargs), key=key,
+                         reverse=reverse, run_size=run_size, tempdir=tempdir)
+
+if __name__ == "__main__":
+    for user in islice(sorted_users(run_size=100), 5):
+        print(user)
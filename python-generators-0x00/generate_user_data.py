@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+"""
+Fast synthetic user_data generator for load testing
+    ./generate_user_data.py 10000000 --output users_10m.csv
+    ./generate_user_data.py 10000000 --database
+"""
+import argparse
+import random
+import sys
+import time
+
+FIRST_NAMES = (
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael',
+    'Linda', 'William', 'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan',
+    'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen', 'Amina',
+    'Kwame', 'Wei', 'Yuki', 'Priya', 'Mateo', 'Sofia', 'Omar', 'Fatima',
+    'Chinedu', 'Ngozi', 'Abebe', 'Lina', 'Ivan', 'Olga', 'Hiro', 'Aisha',
+)
+LAST_NAMES = (
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller',
+    'Davis', 'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Wilson',
+    'Anderson', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Okafor',
+    'Mensah', 'Tesfaye', 'Chen', 'Wang', 'Tanaka', 'Patel', 'Singh',
+    'Kowalski', 'Ivanova', 'Haddad', 'Nguyen', 'Kim', 'Silva', 'Dubois',
+)
+DOMAINS = ('gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com',
+           'icloud.com', 'proton.me', 'example.org')
+# Relative frequency of each domain
+DOMAIN_WEIGHTS = (40, 15, 12, 12, 8, 3, 10)
+# Ages are drawn from a normal distribution clipped to the column's range
+AGE_MEAN, AGE_STDEV, AGE_MIN, AGE_MAX = 38, 16, 1, 120
+
+def _columns_numpy(count, rng):
+    """One chunk of columns, drawn and formatted with NumPy"""
+    import numpy as np
+
+    # Random uuid4s: set the version and variant bits, then hex-encode
+    # through a byte lookup table and splice in the dashes
+    raw = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hex_table = np.frombuffer(
+        "".join(f"{i:02x}" for i in range(256)).encode(),
+        dtype=np.uint8).reshape(256, 2)
+    digits = hex_table[raw].reshape(count, 32)
+    text = np.full((count, 36), ord('-'), dtype=np.uint8)
+    for start, end, offset in ((0, 8, 0), (8, 12, 9), (12, 16, 14),
+                               (16, 20, 19), (20, 32, 24)):
+        text[:, offset:offset + end - start] = digits[:, start:end]
+    user_ids = text.view('S36').ravel().astype(str).tolist()
+
+    firsts = rng.integers(0, len(FIRST_NAMES), size=count).tolist()
+    lasts = rng.integers(0, len(LAST_NAMES), size=count).tolist()
+    weights = np.asarray(DOMAIN_WEIGHTS, dtype=np.float64)
+    domains = rng.choice(len(DOMAINS), size=count,
+                         p=weights / weights.sum()).tolist()
+    numbers = rng.integers(0, 10000, size=count).tolist()
+    ages = np.clip(np.rint(rng.normal(AGE_MEAN, AGE_STDEV, size=count)),
+                   AGE_MIN, AGE_MAX).astype(np.int64).tolist()
+    return user_ids, firsts, lasts, domains, numbers, ages
+
+def _columns_stdlib(count, rng):
+    """One chunk of columns using only the standard library"""
+    raw = bytearray(rng.getrandbits(8 * 16 * count).to_bytes(16 * count,
+                                                               'little'))
+    user_ids = []
+    for start in range(0, 16 * count, 16):
+        raw[start + 6] = (raw[start + 6] & 0x0F) | 0x40
+        raw[start + 8] = (raw[start + 8] & 0x3F) | 0x80
+        digits = raw[start:start + 16].hex()
+        user_ids.append(f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-"
+                        f"{digits[16:20]}-{digits[20:]}")
+    firsts = rng.choices(range(len(FIRST_NAMES)), k=count)
+    lasts = rng.choices(range(len(LAST_NAMES)), k=count)
+    domains = rng.choices(range(len(DOMAINS)), weights=DOMAIN_WEIGHTS,
+                          k=count)
+    numbers = rng.choices(range(10000), k=count)
+    ages = [min(max(round(rng.gauss(AGE_MEAN, AGE_STDEV)), AGE_MIN), AGE_MAX)
+            for _ in range(count)]
+    return user_ids, firsts, lasts, domains, numbers, ages
+
+def generate_chunks(total, chunk_size=100000, seed=None, use_numpy=None):
+    """
+    Generator that yields lists of (user_id, name, email, age) tuples
+    Random draws happen a whole chunk at a time, with NumPy when it is
+    installed (use_numpy=None picks automatically). The same seed gives
+    the same rows.
+    """
+    if use_numpy is None:
+        try:
+            import numpy  # noqa: F401
+            use_numpy = True
+        except ImportError:
+            use_numpy = False
+    if use_numpy:
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        draw = _columns_numpy
+    else:
+        rng = random.Random(seed)
+        draw = _columns_stdlib
+
+    remaining = total
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        remaining -= count
+        user_ids, firsts, lasts, domains, numbers, ages = draw(count, rng)
+        yield [
+            (user_id, f"{FIRST_NAMES[first]} {LAST_NAMES[last]}",
+             f"{FIRST_NAMES[first]}.{LAST_NAMES[last]}{number}"
+             f"@{DOMAINS[domain]}", age)
+            for user_id, first, last, domain, number, age
+            in zip(user_ids, firsts, lasts, domains, numbers, ages)
+        ]
+
+def write_csv(path, total, chunk_size=100000, seed=None):
+    """
+    Writes total synthetic users to a CSV in the user_data.csv layout
+    Each chunk is formatted into one string and written in a single call.
+    """
+    start = time.perf_counter()
+    written = 0
+    with open(path, 'w', newline='', buffering=1 << 20) as file:
+        file.write('"user_id","name","email","age"\n')
+        for chunk in generate_chunks(total, chunk_size, seed):
+            file.write("".join(
+                f'"{user_id}","{name}","{email}","{age}"\n'
+                for user_id, name, email, age in chunk))
+            written += len(chunk)
+            _report(written, start)
+    return written
+
+def write_database(total, chunk_size=10000, seed=None):
+    """Inserts total synthetic users through seed's multi-row insert path"""
+    seed_module = __import__('seed')
+    connection = seed_module.connect_to_prodev()
+    if not connection:
+        return 0
+    try:
+        return seed_module.insert_rows(
+            connection, generate_chunks(total, chunk_size, seed),
+            commit_every=chunk_size * 10)
+    finally:
+        connection.close()
+
+def _report(rows, start):
+    """Prints rows generated so far and the rate"""
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed else 0.0
+    print(f"{rows} rows generated ({rate:.0f} rows/sec)", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--output', default='user_data_large.csv')
+    parser.add_argument('--database', action='store_true',
+                        help="insert into ALX_prodev instead of writing a CSV")
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    if args.database:
+        write_database(args.rows, min(args.chunk_size, 10000), args.seed)
+    else:
+        write_csv(args.output, args.rows, args.chunk_size, args.seed)
@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+"""
+Partitioned parallel scans of user_data
+"""
+import heapq
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from mysql.connector import Error
+
+import db_pool
+from background import DONE, Failure, batched, blocking_put, drain, produce
+
+users = __import__('0-stream_users')
+batches = __import__('1-batch_processing')
+stream_stats = __import__('stream_stats')
+
+def partition_filters(partitions, mode='range'):
+    """
+    WHERE conditions that split user_data into disjoint partitions
+    'range' cuts the user_id space at evenly spaced hex prefixes, which
+    balances uuid keys and lets each partition read one primary key range.
+    'hash' buckets rows by CRC32(user_id); it balances any key but every
+    partition scans the whole table. Returns a list of (clause, params).
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+    if mode == 'hash':
+        return [("MOD(CRC32(user_id), %s) = %s", (partitions, bucket))
+                for bucket in range(partitions)]
+    if mode != 'range':
+        raise ValueError(f"Unsupported partition mode: {mode}")
+
+    # The first and last ranges are open-ended, so non-uuid keys are covered
+    bounds = [f"{i * 16 ** 8 // partitions:08x}" for i in range(1, partitions)]
+    lows = [None] + bounds
+    highs = bounds + [None]
+    filters = []
+    for low, high in zip(lows, highs):
+        conditions = []
+        params = []
+        if low is not None:
+            conditions.append("user_id >= %s")
+            params.append(low)
+        if high is not None:
+            conditions.append("user_id < %s")
+            params.append(high)
+        filters.append((" AND ".join(conditions) or "TRUE", tuple(params)))
+    return filters
+
+def _partition_query(clause, columns, ordered):
+    """SELECT statement for one partition"""
+    select_list = batches._select_columns(columns)
+    if ordered and columns is not None and 'user_id' not in columns:
+        raise ValueError("Ordered scans need the user_id column")
+    order_by = " ORDER BY user_id" if ordered else ""
+    return f"SELECT {select_list} FROM user_data WHERE {clause}{order_by}"
+
+def _reserve_connections(count, timeout):
+    """
+    Borrows count connections from the shared pool, all or none
+    Raises mysql.connector.errors.PoolError if they cannot all be had
+    within timeout seconds, instead of leaving partitions waiting on a
+    pool that other partitions hold.
+    """
+    pool = db_pool.get_pool()
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(pool.get_connection(timeout))
+    except Error:
+        for connection in connections:
+            connection.close()
+        raise
+    return connections
+
+def parallel_stream_users(partitions=4, mode='range', ordered=False,
+                          columns=None, block_size=500, max_blocks=8,
+                          timeout=db_pool.CONNECT_TIMEOUT):
+    """
+    Generator that scans user_data on several connections at once
+    Each partition (see partition_filters) streams in its own thread.
+    Unordered output interleaves blocks as they arrive; ordered=True
+    yields rows in user_id order by merging the sorted partitions.
+    Memory is bounded by max_blocks blocks of block_size rows per stream.
+
+    partitions is capped at the pool size, and every partition's
+    connection is reserved (waiting up to timeout seconds) before any
+    scan starts, since the ordered merge needs all of them at once.
+    A database error in any partition is raised to the consumer.
+    """
+    partitions = min(partitions, db_pool.get_pool().max_size)
+    filters = partition_filters(partitions, mode)
+    for clause, _ in filters:
+        _partition_query(clause, columns, ordered)
+    connections = _reserve_connections(len(filters), timeout)
+    stop = threading.Event()
+    workers = []
+
+    def start(clause, params, out, tag):
+        query = _partition_query(clause, columns, ordered)
+        rows = users._iter_rows(query, params, block_size, 'dict',
+                                connections.pop())
+        put = blocking_put(out, stop)
+        if tag is not None:
+            untagged = put
+
+            def put(item):
+                return untagged((tag, item))
+
+        worker = threading.Thread(target=produce, daemon=True,
+                                  args=(batched(rows, block_size), put))
+        worker.start()
+        workers.append(worker)
+
+    try:
+        if ordered:
+            outs = [queue.Queue(max_blocks) for _ in filters]
+            for (clause, params), out in zip(filters, outs):
+                start(clause, params, out, None)
+            yield from heapq.merge(*[_rows(out) for out in outs],
+                                   key=lambda row: row['user_id'])
+        else:
+            out = queue.Queue(max_blocks * len(filters))
+            for tag, (clause, params) in enumerate(filters):
+                start(clause, params, out, tag)
+            remaining = len(filters)
+            while remaining:
+                _, block = out.get()
+                if block is DONE:
+                    remaining -= 1
+                    continue
+                if isinstance(block, Failure):
+                    raise block.error
+                yield from block
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+        # Connections of partitions that never started
+        for connection in connections:
+            connection.close()
+
+def _rows(out):
+    """Rows of one partition queue, in the order they were produced"""
+    for block in drain(out):
+        yield from block
+
+def _partition_age_stats(clause, params):
+    """Process pool worker: one-pass statistics over one partition's ages"""
+    query = f"SELECT age FROM user_data WHERE {clause}"
+    stats = stream_stats.RunningStats()
+    digest = stream_stats.TDigest()
+    for row in users._iter_rows(query, params, 1000, 'dict'):
+        age = float(row['age'])
+        stats.add(age)
+        digest.add(age)
+    return stats, digest
+
+def parallel_age_statistics(partitions=4, mode='range',
+                            percentiles=(0.5, 0.9, 0.99)):
+    """
+    Age statistics computed by one process per partition
+    Each process aggregates its partition on its own connection and the
+    mergeable partial results are combined at the end.
+    """
+    filters = partition_filters(partitions, mode)
+    stats = stream_stats.RunningStats()
+    digest = stream_stats.TDigest()
+    with ProcessPoolExecutor(partitions) as executor:
+        futures = [executor.submit(_partition_age_stats, clause, params)
+                   for clause, params in filters]
+        for future in futures:
+            partial_stats, partial_digest = future.result()
+            stats.merge(partial_stats)
+            digest.merge(partial_digest)
+    return stream_stats.build_summary(stats, digest, percentiles)
+
+if __name__ == "__main__":
+    print(parallel_age_statistics())
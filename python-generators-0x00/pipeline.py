@@ -0,0 +1,323 @@
+#!/usr/bin/python3
+"""
+Composable streaming pipelines over the user generators
+    (Pipeline.users()
+        .filter(lambda user: user['age'] > 25)
+        .map(lambda user: user['email'])
+        .batch(500)
+        .sink(write_batch))
+Adjacent map/filter/flatten stages are fused into one generated loop,
+so each row costs one generator step instead of one per stage.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from background import read_ahead
+from external_sort import external_sort
+
+users = __import__('0-stream_users')
+batches = __import__('1-batch_processing')
+
+_FUSABLE = ('map', 'filter', 'flatten')
+
+class StageStats:
+    """Counters for one (possibly fused) stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {'stage': self.name, 'items_in': self.items_in,
+                'items_out': self.items_out, 'seconds': self.seconds}
+
+def _fuse(ops):
+    """
+    Compiles consecutive map/filter/flatten ops into one generator function
+    The generated loop calls each op inline and counts items as they pass.
+    """
+    env = {}
+    lines = ["def fused(upstream, stats):",
+             "    taken = passed = 0",
+             "    try:",
+             "        for item in upstream:",
+             "            taken += 1"]
+    indent = " " * 12
+    for index, (kind, fn) in enumerate(ops):
+        env[f"f{index}"] = fn
+        if kind == 'map':
+            lines.append(f"{indent}item = f{index}(item)")
+        elif kind == 'filter':
+            lines.append(f"{indent}if not f{index}(item):")
+            lines.append(f"{indent}    continue")
+        else:
+            lines.append(f"{indent}for item in item:")
+            indent += "    "
+    lines.append(f"{indent}passed += 1")
+    lines.append(f"{indent}yield item")
+    lines += ["    finally:",
+              "        stats.items_in += taken",
+              "        stats.items_out += passed"]
+    exec("\n".join(lines), env)
+    return env['fused']
+
+def _batch(upstream, stats, size):
+    batch = []
+    for item in upstream:
+        stats.items_in += 1
+        batch.append(item)
+        if len(batch) == size:
+            stats.items_out += 1
+            yield batch
+            batch = []
+    if batch:
+        stats.items_out += 1
+        yield batch
+
+def _window(upstream, stats, size, step):
+    """Windows of size items, starting every step items"""
+    window = []
+    skip = 0
+    for item in upstream:
+        stats.items_in += 1
+        if skip:
+            skip -= 1
+            continue
+        window.append(item)
+        if len(window) == size:
+            stats.items_out += 1
+            yield list(window)
+            if step >= size:
+                window = []
+                skip = step - size
+            else:
+                del window[:step]
+
+def _sort(upstream, stats, key, reverse, run_size):
+    def counted():
+        for item in upstream:
+            stats.items_in += 1
+            yield item
+
+    for item in external_sort(counted(), key=key, reverse=reverse,
+                              run_size=run_size):
+        stats.items_out += 1
+        yield item
+
+def _buffer(upstream, stats, size):
+    """Pulls upstream in a background thread through a bounded queue"""
+    def counted():
+        try:
+            for item in upstream:
+                stats.items_in += 1
+                yield item
+        finally:
+            close = getattr(upstream, 'close', None)
+            if close:
+                close()
+
+    for item in read_ahead(counted, size):
+        stats.items_out += 1
+        yield item
+
+def _map_chunk(fn, chunk):
+    return [fn(item) for item in chunk]
+
+def _parallel_map(upstream, stats, fn, workers, executor_class, chunk_size):
+    """
+    Applies fn in a thread or process pool, keeping input order
+    Items are sent in chunks and at most 2 * workers chunks are in
+    flight, which bounds memory.
+    """
+    pending = []
+    with executor_class(workers) as executor:
+        chunk = []
+        for item in upstream:
+            stats.items_in += 1
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                pending.append(executor.submit(_map_chunk, fn, chunk))
+                chunk = []
+                if len(pending) >= 2 * workers:
+                    for result in pending.pop(0).result():
+                        stats.items_out += 1
+                        yield result
+        if chunk:
+            pending.append(executor.submit(_map_chunk, fn, chunk))
+        for future in pending:
+            for result in future.result():
+                stats.items_out += 1
+                yield result
+
+def _timed(upstream, stats):
+    """Adds the time spent producing each item to stats.seconds"""
+    iterator = iter(upstream)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            finally:
+                stats.seconds += time.perf_counter() - start
+            yield item
+    except StopIteration:
+        return
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            close()
+
+class Pipeline:
+    """
+    Chain of stages over a source iterable
+    Stages are recorded by map/filter/flatten/batch/window/sort/buffer and
+    only run when the pipeline is iterated or sunk. With timed=True every
+    stage records the time spent in it (excluding upstream stages), at
+    the cost of a timing call per item and stage.
+    """
+
+    def __init__(self, source, timed=False):
+        self.source = source
+        self.timed = timed
+        self.stages = []
+        self._stats = []
+
+    @classmethod
+    def users(cls, timed=False, **kwargs):
+        """Pipeline over stream_users(**kwargs)"""
+        return cls(lambda: users.stream_users(**kwargs), timed)
+
+    @classmethod
+    def user_batches(cls, batch_size, timed=False, **kwargs):
+        """Pipeline over stream_users_in_batches(batch_size, **kwargs)"""
+        return cls(lambda: batches.stream_users_in_batches(batch_size,
+                                                           **kwargs), timed)
+
+    def _add(self, kind, **options):
+        self.stages.append((kind, options))
+        return self
+
+    def map(self, fn, workers=0, processes=False, chunk_size=256):
+        """
+        Applies fn to every item
+        workers > 0 runs fn in a thread pool (or a process pool with
+        processes=True, which needs a picklable fn) instead of inline.
+        """
+        if workers:
+            return self._add('parallel_map', fn=fn, workers=workers,
+                             processes=processes, chunk_size=chunk_size)
+        return self._add('map', fn=fn)
+
+    def filter(self, predicate):
+        """Keeps items for which predicate is true"""
+        return self._add('filter', fn=predicate)
+
+    def flatten(self):
+        """Yields the elements of each item, e.g. the rows of a batch"""
+        return self._add('flatten', fn=None)
+
+    def batch(self, size):
+        """Groups items into lists of size"""
+        return self._add('batch', size=size)
+
+    def window(self, size, step=None):
+        """Lists of size consecutive items, starting every step items"""
+        return self._add('window', size=size, step=step or size)
+
+    def sort(self, key=None, reverse=False, run_size=100000):
+        """Sorts items, spilling runs of run_size items to disk"""
+        return self._add('sort', key=key, reverse=reverse, run_size=run_size)
+
+    def buffer(self, size):
+        """Runs everything upstream in a thread, at most size items ahead"""
+        return self._add('buffer', size=size)
+
+    def _groups(self):
+        """Stages with runs of fusable ones merged"""
+        groups = []
+        for kind, options in self.stages:
+            if kind in _FUSABLE:
+                if groups and groups[-1][0] == 'fused':
+                    groups[-1][1].append((kind, options['fn']))
+                else:
+                    groups.append(('fused', [(kind, options['fn'])]))
+            else:
+                groups.append((kind, options))
+        return groups
+
+    def __iter__(self):
+        source = self.source() if callable(self.source) else self.source
+        stream = iter(source)
+        source_stats = StageStats('source')
+        self._stats = [source_stats]
+        if self.timed:
+            stream = _timed(stream, source_stats)
+
+        for kind, options in self._groups():
+            if kind == 'fused':
+                stats = StageStats("+".join(op for op, _ in options))
+                stream = _fuse(options)(stream, stats)
+            else:
+                stats = StageStats(kind)
+                if kind == 'batch':
+                    stream = _batch(stream, stats, options['size'])
+                elif kind == 'window':
+                    stream = _window(stream, stats, options['size'],
+                                     options['step'])
+                elif kind == 'sort':
+                    stream = _sort(stream, stats, options['key'],
+                                   options['reverse'], options['run_size'])
+                elif kind == 'buffer':
+                    stream = _buffer(stream, stats, options['size'])
+                else:
+                    executor_class = (ProcessPoolExecutor
+                                      if options['processes']
+                                      else ThreadPoolExecutor)
+                    stream = _parallel_map(stream, stats, options['fn'],
+                                           options['workers'], executor_class,
+                                           options['chunk_size'])
+            if self.timed:
+                stream = _timed(stream, stats)
+            self._stats.append(stats)
+        return stream
+
+    def sink(self, fn):
+        """Runs the pipeline, calling fn on every output; returns the count"""
+        count = 0
+        for item in self:
+            fn(item)
+            count += 1
+        return count
+
+    def collect(self):
+        """Runs the pipeline and returns its outputs as a list"""
+        return list(self)
+
+    def stats(self):
+        """
+        Per-stage counters from the last run
+        seconds is inclusive of upstream stages while running; here it is
+        reported exclusive, i.e. each stage's own time.
+        """
+        result = []
+        upstream_seconds = 0.0
+        if len(self._stats) > 1:
+            source = self._stats[0]
+            source.items_in = source.items_out = self._stats[1].items_in
+        for stats in self._stats:
+            entry = stats.as_dict()
+            entry['seconds'] = max(stats.seconds - upstream_seconds, 0.0)
+            upstream_seconds = stats.seconds
+            result.append(entry)
+        return result
+
+if __name__ == "__main__":
+    pipeline = (Pipeline.users(timed=True)
+                .filter(lambda user: user['age'] > 25)
+                .map(lambda user: user['email'].split('@')[1])
+                .batch(100))
+    print(f"{pipeline.sink(lambda batch: None)} batches")
+    for stage in pipeline.stats():
+        print(stage)
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""
+Row representations for the user streamers
+    'dict'      a dictionary per row (the default)
+    'tuple'     a plain tuple per row; column_index() maps names to positions
+    'record'    a namedtuple per row (tuple-sized, with attribute access)
+    'columnar'  one list per column for a whole batch (batch streamers only)
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+
+ROW_FORMATS = ('dict', 'tuple', 'record', 'columnar')
+
+def check_format(row_format, batched=False):
+    """Validates a row format name for a streamer"""
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f"Unknown row format: {row_format}")
+    if row_format == 'columnar' and not batched:
+        raise ValueError("The columnar format needs a batch streamer")
+
+@lru_cache(maxsize=None)
+def column_index(columns=USER_COLUMNS):
+    """Position of each column in 'tuple' rows, shared by every row"""
+    return {column: position for position, column in enumerate(columns)}
+
+def _make_record(columns, values):
+    """Unpickles a 'record' row"""
+    return record_class(columns)(*values)
+
+def _reduce_record(record):
+    return _make_record, (record._fields, tuple(record))
+
+@lru_cache(maxsize=None)
+def record_class(columns=USER_COLUMNS):
+    """
+    namedtuple class used for 'record' rows with these columns
+    The classes are built at runtime, so they pickle through
+    _make_record (e.g. for process pools or external_sort spills).
+    """
+    return type('UserRecord', (namedtuple('UserRecord', columns),),
+                {'__slots__': (), '__reduce__': _reduce_record})
+
+def convert_batch(rows, columns, row_format):
+    """
+    Converts tuples fetched from a plain cursor into row_format
+    'dict' batches are fetched with a dictionary cursor instead and
+    are returned unchanged.
+    """
+    if row_format == 'record':
+        make = record_class(tuple(columns))._make
+        return [make(row) for row in rows]
+    if row_format == 'columnar':
+        columnar = list(zip(*rows)) if rows else [()] * len(columns)
+        return {column: list(values)
+                for column, values in zip(columns, columnar)}
+    return rows
@@ -4,8 +4,47 @@ Database seeding script for ALX_prodev
 """
 import mysql.connector
 import csv
+import multiprocessing
+import os
+import sys
+import time
 import uuid
+import zlib
 from mysql.connector import Error
+import db_pool
+import dedup
+import fast_csv
+import user_stats
+
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+
+INSERT_IGNORE_QUERY = """
+INSERT IGNORE INTO user_data (user_id, name, email, age)
+VALUES (%s, %s, %s, %s)
+"""
+
+UPSERT_QUERY = """
+INSERT INTO user_data (user_id, name, email, age)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE name = VALUES(name), email = VALUES(email),
+age = VALUES(age)
+"""
+
+PROGRESS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS seed_progress (
+    source VARCHAR(512) PRIMARY KEY,
+    byte_offset BIGINT NOT NULL,
+    line_number BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+CHECKPOINT_QUERY = """
+INSERT INTO seed_progress (source, byte_offset, line_number)
+VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE byte_offset = VALUES(byte_offset),
+line_number = VALUES(line_number), updated_at = CURRENT_TIMESTAMP
+"""
 
 def connect_db():
     """Connects to the MySQL database server"""
@@ -30,14 +69,17 @@ def create_database(connection):
     except Error as e:
         print(f"Error creating database: {e}")
 
-def connect_to_prodev():
-    """Connects to the ALX_prodev database in MySQL"""
+def connect_to_prodev(allow_local_infile=False):
+    """
+    Connects to the ALX_prodev database in MySQL
+    Connections come from the shared db_pool pool, except LOAD DATA
+    LOCAL INFILE ones, which need their own connection option.
+    """
+    if not allow_local_infile:
+        return db_pool.connect_to_prodev()
     try:
         connection = mysql.connector.connect(
-            host='localhost',
-            user='root',      # Change as per your MySQL setup
-            password='',      # Change as per your MySQL setup
-            database='ALX_prodev'
+            allow_local_infile=True, **db_pool.DB_CONFIG
         )
         return connection
     except Error as e:
@@ -54,7 +96,8 @@ def create_table(connection):
             name VARCHAR(255) NOT NULL,
             email VARCHAR(255) NOT NULL,
             age DECIMAL(5,2) NOT NULL,
-            INDEX idx_user_id (user_id)
+            INDEX idx_user_id (user_id),
+            INDEX idx_age (age)
         )
         """
         cursor.execute(create_table_query)
@@ -62,6 +105,35 @@ def create_table(connection):
         cursor.close()
     except Error as e:
         print(f"Error creating table: {e}")
+        return
+    create_age_index(connection)
+
+def create_age_index(connection):
+    """Adds idx_age to a user_data table created before it existed"""
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'user_data'
+        AND index_name = 'idx_age'
+        """)
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("CREATE INDEX idx_age ON user_data (age)")
+            print("Index idx_age created")
+        cursor.close()
+    except Error as e:
+        print(f"Error creating index: {e}")
+
+def _row_user_id(row):
+    """
+    Returns the user_id of a CSV row
+    Files without a user_id column get one derived from the row content,
+    so loading the same file twice produces the same keys.
+    """
+    if row.get('user_id'):
+        return row['user_id']
+    key = f"{row['name']}|{row['email']}|{row['age']}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
 
 def insert_data(connection, csv_file):
     """Inserts data in the database if it does not exist"""
@@ -75,7 +147,8 @@ def insert_data(connection, csv_file):
             for row in csv_reader:
                 # Check if user already exists
                 check_query = "SELECT user_id FROM user_data WHERE user_id = %s"
-                cursor.execute(check_query, (row['user_id'],))
+                user_id = _row_user_id(row)
+                cursor.execute(check_query, (user_id,))
                 exists = cursor.fetchone()
                 
                 if not exists:
@@ -85,7 +158,7 @@ def insert_data(connection, csv_file):
                     VALUES (%s, %s, %s, %s)
                     """
                     cursor.execute(insert_query, (
-                        row['user_id'],
+                        user_id,
                         row['name'],
                         row['email'],
                         float(row['age'])
@@ -99,15 +172,451 @@ def insert_data(connection, csv_file):
     except FileNotFoundError:
         print(f"CSV file {csv_file} not found")
 
+def _row_values(row):
+    """Converts a CSV row dictionary into user_data insert values"""
+    return (_row_user_id(row), row['name'], row['email'], float(row['age']))
+
+def read_csv_chunks(csv_file, chunk_size):
+    """Generator that yields user_data rows from a CSV as lists of tuples"""
+    with open(csv_file, 'r', newline='') as file:
+        chunk = []
+        for row in csv.DictReader(file):
+            chunk.append(_row_values(row))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def _insert_chunks(connection, chunks, on_duplicate, commit_every,
+                   progress=True):
+    """
+    Sends each chunk as one executemany, committing every commit_every rows
+    With the statistics triggers installed, the changes are collected in
+    a user_stats.StatsDelta and applied once per commit instead.
+    """
+    query = _duplicate_query(on_duplicate)
+    total = 0
+    uncommitted = 0
+    start = time.perf_counter()
+    cursor = connection.cursor()
+    stats = None
+    try:
+        stats = user_stats.StatsDelta.begin(cursor, on_duplicate == 'update')
+        for chunk in chunks:
+            if stats:
+                stats.add_chunk(cursor, chunk)
+            cursor.executemany(query, chunk)
+            total += len(chunk)
+            uncommitted += len(chunk)
+            if uncommitted >= commit_every:
+                if stats:
+                    stats.apply(cursor)
+                connection.commit()
+                uncommitted = 0
+                if progress:
+                    _report_progress(total, start)
+        if stats:
+            stats.apply(cursor)
+        connection.commit()
+        if progress:
+            _report_progress(total, start)
+    finally:
+        if stats:
+            stats.end(cursor)
+        cursor.close()
+    return total
+
+def _duplicate_query(on_duplicate):
+    """Picks the insert statement for an on_duplicate mode"""
+    if on_duplicate not in ('ignore', 'update'):
+        raise ValueError(f"Unsupported on_duplicate mode: {on_duplicate}")
+    return INSERT_IGNORE_QUERY if on_duplicate == 'ignore' else UPSERT_QUERY
+
+def bulk_insert_data(connection, csv_file, chunk_size=1000,
+                     commit_every=10000, on_duplicate='ignore', reader='csv'):
+    """
+    Inserts data from a CSV in multi-row statements
+    Each chunk of chunk_size rows is sent as one INSERT via executemany,
+    with a commit every commit_every rows. Existing users are kept with
+    on_duplicate='ignore' or overwritten with on_duplicate='update'.
+    reader='mmap' parses the file with fast_csv and reports parse and
+    database throughput separately. Returns the number of CSV rows
+    processed.
+    """
+    if reader not in ('csv', 'mmap'):
+        raise ValueError(f"Unsupported reader: {reader}")
+    _duplicate_query(on_duplicate)
+    total = 0
+    try:
+        if reader == 'mmap':
+            parse_stats = fast_csv.ParseStats()
+            chunks = fast_csv.read_mmap_chunks(csv_file, chunk_size,
+                                               stats=parse_stats)
+            start = time.perf_counter()
+            total = _insert_chunks(connection, chunks, on_duplicate,
+                                   commit_every, progress=False)
+            _report_split(total, time.perf_counter() - start, parse_stats)
+        else:
+            chunks = read_csv_chunks(csv_file, chunk_size)
+            total = _insert_chunks(connection, chunks, on_duplicate,
+                                   commit_every)
+    except Error as e:
+        print(f"Error inserting data: {e}")
+    except FileNotFoundError:
+        print(f"CSV file {csv_file} not found")
+    return total
+
+def _report_split(rows, elapsed, parse_stats):
+    """Prints parse and database throughput for a load of rows"""
+    database_seconds = max(elapsed - parse_stats.seconds, 0.0)
+    rate = rows / database_seconds if database_seconds else 0.0
+    print(f"{rows} rows loaded, {parse_stats.report()}, "
+          f"database: {rate:.0f} rows/sec")
+
+def _new_rows(connection, chunks, index, exact, counts):
+    """
+    Drops rows whose user_id already exists from each chunk
+    Ids the index rules out pass straight through; the possible ones are
+    confirmed with one IN (...) query per chunk unless the index is exact.
+    """
+    for chunk in chunks:
+        possible = [row[0] for row in chunk if row[0] in index]
+        if exact:
+            existing = set(possible)
+        else:
+            existing = dedup.confirm_existing(connection, possible)
+            counts['lookups'] += bool(possible)
+            counts['false_positives'] += len(set(possible) - existing)
+        new = [row for row in chunk if row[0] not in existing]
+        counts['skipped'] += len(chunk) - len(new)
+        if new:
+            yield new
+
+def dedup_insert_data(connection, csv_file, chunk_size=1000,
+                      commit_every=10000, exact=False, error_rate=0.01):
+    """
+    Inserts only the CSV rows whose user_id is not in user_data yet
+    The existing ids are first streamed into a Bloom filter with the
+    given error_rate (or, with exact=True, a sorted id file on disk), so
+    duplicates are found in memory and only possible collisions are
+    looked up, a chunk at a time. Inserts still use INSERT IGNORE, which
+    also covers ids repeated within the CSV. Returns the number of new
+    rows sent.
+    """
+    counts = {'skipped': 0, 'lookups': 0, 'false_positives': 0}
+    total = 0
+    index = None
+    try:
+        index = dedup.build_index(connection, exact, error_rate)
+        chunks = _new_rows(connection, read_csv_chunks(csv_file, chunk_size),
+                           index, exact, counts)
+        total = _insert_chunks(connection, chunks, 'ignore', commit_every)
+        print(f"{counts['skipped']} existing users skipped, "
+              f"{counts['lookups']} lookups "
+              f"({counts['false_positives']} false positives)")
+    except Error as e:
+        print(f"Error inserting data: {e}")
+    except FileNotFoundError:
+        print(f"CSV file {csv_file} not found")
+    finally:
+        if exact and index is not None:
+            index.close()
+    return total
+
+def _report_progress(rows, start):
+    """Prints rows loaded so far and the load rate"""
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed else 0.0
+    print(f"{rows} rows loaded ({rate:.0f} rows/sec)")
+
+def insert_rows(connection, chunks, commit_every=10000,
+                on_duplicate='ignore', progress=True):
+    """
+    Inserts pre-built chunks of (user_id, name, email, age) tuples
+    Same multi-row path as bulk_insert_data, for rows that do not come
+    from a CSV file. Returns the number of rows sent.
+    """
+    return _insert_chunks(connection, chunks, on_duplicate, commit_every,
+                          progress)
+
+def load_data_infile(connection, csv_file):
+    """
+    Loads a CSV with LOAD DATA LOCAL INFILE
+    Needs a connection opened with connect_to_prodev(allow_local_infile=True)
+    and local_infile enabled on the server. Only files that carry their own
+    user_id column can be loaded this way; returns None for other files so
+    the caller can fall back to bulk_insert_data.
+    """
+    try:
+        with open(csv_file, 'r', newline='') as file:
+            columns = next(csv.reader(file))
+    except FileNotFoundError:
+        print(f"CSV file {csv_file} not found")
+        return None
+
+    if 'user_id' not in columns or not set(columns) <= set(USER_COLUMNS):
+        print(f"{csv_file} has no user_id column, use bulk_insert_data")
+        return None
+
+    query = f"""
+    LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE user_data
+    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+    LINES TERMINATED BY '\\n'
+    IGNORE 1 LINES ({', '.join(columns)})
+    """
+    start = time.perf_counter()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query, (csv_file,))
+        rows = cursor.rowcount
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        print(f"Error loading data: {e}")
+        return None
+    _report_progress(rows, start)
+    return rows
+
+def split_csv(csv_file, parts):
+    """
+    Splits a CSV into byte ranges that start and end on line boundaries
+    Returns the header fields and a list of (start, end) offsets covering
+    every data line once. Fields must not contain embedded newlines.
+    """
+    with open(csv_file, 'rb') as file:
+        fieldnames = next(csv.reader([file.readline().decode('utf-8')]))
+        data_start = file.tell()
+        size = file.seek(0, 2)
+
+        boundaries = [data_start]
+        step = max((size - data_start) // max(parts, 1), 1)
+        for offset in range(data_start + step, size, step):
+            # Move the cut to the start of the next line
+            file.seek(offset - 1)
+            file.readline()
+            if file.tell() > boundaries[-1]:
+                boundaries.append(file.tell())
+        if boundaries[-1] < size:
+            boundaries.append(size)
+    return fieldnames, list(zip(boundaries, boundaries[1:]))
+
+def read_csv_range_chunks(csv_file, fieldnames, start, end, chunk_size):
+    """Generator that yields insert values for the lines in [start, end)"""
+    for chunk, _, _ in _offset_chunks(csv_file, fieldnames, start, end,
+                                      chunk_size):
+        yield chunk
+
+def _offset_chunks(csv_file, fieldnames, start, end, chunk_size):
+    """
+    Generator of (chunk, offset, lines) for the lines in [start, end)
+    offset is the byte position just past the chunk's last line and lines
+    the number of file lines read for the chunk, including blank lines
+    DictReader skips; end=None reads to the end of the file.
+    """
+    with open(csv_file, 'rb') as file:
+        file.seek(start)
+        consumed = 0
+
+        def lines():
+            nonlocal consumed
+            while end is None or file.tell() < end:
+                line = file.readline()
+                if not line:
+                    break
+                consumed += 1
+                yield line.decode('utf-8')
+
+        chunk = []
+        # Each row is one line, so file.tell() is where the row ends
+        for row in csv.DictReader(lines(), fieldnames=fieldnames):
+            chunk.append(_row_values(row))
+            if len(chunk) == chunk_size:
+                yield chunk, file.tell(), consumed
+                chunk = []
+                consumed = 0
+        if chunk:
+            yield chunk, file.tell(), consumed
+
+def read_csv_partition_chunks(csv_file, partition, partitions, chunk_size):
+    """
+    Generator that yields insert values for one hash partition of a CSV
+    Keeps the rows whose user_id has MOD(CRC32(user_id), partitions) equal
+    to partition, in file order.
+    """
+    with open(csv_file, 'r', newline='') as file:
+        chunk = []
+        for row in csv.DictReader(file):
+            user_id = _row_user_id(row)
+            if zlib.crc32(user_id.encode()) % partitions != partition:
+                continue
+            chunk.append((user_id, row['name'], row['email'],
+                          float(row['age'])))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def _load_partition(task):
+    """Process pool worker: loads one hash partition on its own connection"""
+    (csv_file, partition, partitions, chunk_size, commit_every,
+     on_duplicate) = task
+    result = {'partition': partition, 'rows': 0, 'error': None}
+    connection = connect_to_prodev()
+    if not connection:
+        result['error'] = "could not connect to ALX_prodev"
+        return result
+    try:
+        chunks = read_csv_partition_chunks(csv_file, partition, partitions,
+                                           chunk_size)
+        result['rows'] = _insert_chunks(connection, chunks, on_duplicate,
+                                        commit_every, progress=False)
+    except Exception as e:
+        # Reported with the other failures instead of aborting the pool
+        result['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        connection.close()
+    return result
+
+def parallel_insert_data(csv_file, workers=None, chunk_size=1000,
+                         commit_every=10000, on_duplicate='ignore'):
+    """
+    Loads a CSV with a pool of processes, one connection per process
+    Rows are split into one partition per worker by CRC32 of their
+    user_id (derived from the row content when the file has none), and
+    each partition goes through the bulk insert path. Every occurrence of
+    a user_id is loaded by the same process in file order, so the table
+    ends up as a serial bulk_insert_data leaves it: on_duplicate='ignore'
+    keeps the first occurrence and 'update' the last. Each process reads
+    the whole file but inserts only its own rows.
+    Returns (rows loaded, list of failed partition results).
+    """
+    _duplicate_query(on_duplicate)
+    workers = workers or os.cpu_count() or 1
+    if not os.path.isfile(csv_file):
+        print(f"CSV file {csv_file} not found")
+        return 0, []
+
+    tasks = [(csv_file, partition, workers, chunk_size, commit_every,
+              on_duplicate) for partition in range(workers)]
+    total = 0
+    failures = []
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(_load_partition, tasks):
+            total += result['rows']
+            if result['error']:
+                failures.append(result)
+                print(f"Error loading partition {result['partition']}: "
+                      f"{result['error']}")
+            _report_progress(total, started)
+    return total, failures
+
+def create_progress_table(connection):
+    """Creates the seed_progress checkpoint table if it does not exist"""
+    try:
+        cursor = connection.cursor()
+        cursor.execute(PROGRESS_TABLE_QUERY)
+        cursor.close()
+    except Error as e:
+        print(f"Error creating progress table: {e}")
+
+def resumable_insert_data(connection, csv_file, batch_size=1000,
+                          on_duplicate='ignore', restart=False):
+    """
+    Inserts data from a CSV, checkpointing after every batch
+    Each batch is committed together with its end byte offset and line
+    number in seed_progress, so a re-run after a failure seeks straight
+    past the committed lines instead of replaying them. restart=True
+    discards the checkpoint. The checkpoint is keyed by the file's
+    absolute path; a file edited in place must be loaded with restart.
+    Statistics are kept up to date per batch like in _insert_chunks.
+    Returns the number of rows inserted by this run.
+    """
+    query = _duplicate_query(on_duplicate)
+    source = os.path.abspath(csv_file)
+    create_progress_table(connection)
+    total = 0
+    start = time.perf_counter()
+    cursor = None
+    stats = None
+    try:
+        fieldnames, ranges = split_csv(csv_file, 1)
+        data_start = ranges[0][0] if ranges else None
+
+        cursor = connection.cursor()
+        if restart:
+            cursor.execute("DELETE FROM seed_progress WHERE source = %s",
+                           (source,))
+            connection.commit()
+        cursor.execute("SELECT byte_offset, line_number FROM seed_progress "
+                       "WHERE source = %s", (source,))
+        checkpoint = cursor.fetchone()
+        offset, line_number = checkpoint or (data_start, 1)
+        if checkpoint:
+            print(f"Resuming {csv_file} after line {line_number}")
+
+        if data_start is not None:
+            stats = user_stats.StatsDelta.begin(cursor,
+                                                on_duplicate == 'update')
+            for chunk, offset, lines in _offset_chunks(csv_file, fieldnames,
+                                                       offset, None,
+                                                       batch_size):
+                if stats:
+                    stats.add_chunk(cursor, chunk)
+                cursor.executemany(query, chunk)
+                line_number += lines
+                cursor.execute(CHECKPOINT_QUERY, (source, offset, line_number))
+                if stats:
+                    stats.apply(cursor)
+                connection.commit()
+                total += len(chunk)
+                _report_progress(total, start)
+    except Error as e:
+        try:
+            connection.rollback()
+        except Error:
+            # The connection is gone; its open transaction went with it
+            pass
+        print(f"Error inserting data: {e}")
+    except FileNotFoundError:
+        print(f"CSV file {csv_file} not found")
+    finally:
+        if cursor:
+            if stats:
+                stats.end(cursor)
+            cursor.close()
+    return total
+
 if __name__ == "__main__":
-    # For testing purposes
+    # For testing purposes:
+    # ./seed.py [csv_file] [--bulk [--mmap] | --parallel | --resume |
+    #                       --dedup | --load-data]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    csv_file = args[0] if args else 'user_data.csv'
     connection = connect_db()
     if connection:
         create_database(connection)
         connection.close()
         
-        connection = connect_to_prodev()
+        load_data = '--load-data' in sys.argv
+        connection = connect_to_prodev(allow_local_infile=load_data)
         if connection:
             create_table(connection)
-            insert_data(connection, 'user_data.csv')
-            connection.close()
\ No newline at end of file
+            user_stats.create_stats_tables(connection)
+            if load_data:
+                if load_data_infile(connection, csv_file) is None:
+                    bulk_insert_data(connection, csv_file)
+            elif '--bulk' in sys.argv:
+                reader = 'mmap' if '--mmap' in sys.argv else 'csv'
+                bulk_insert_data(connection, csv_file, reader=reader)
+            elif '--parallel' in sys.argv:
+                parallel_insert_data(csv_file)
+            elif '--resume' in sys.argv:
+                resumable_insert_data(connection, csv_file)
+            elif '--dedup' in sys.argv:
+                dedup_insert_data(connection, csv_file)
+            else:
+                insert_data(connection, csv_file)
+            connection.close()
@@ -0,0 +1,318 @@
+#!/usr/bin/python3
+"""
+Fixed-memory sketches over streamed users
+Distinct email domains (HyperLogLog), frequent names (Misra-Gries top-k)
+and age quantiles (t-digest), plus a Count-Min sketch for frequencies of
+arbitrary values. Every sketch can be merged with one built on another
+partition and saved as JSON.
+"""
+import hashlib
+import heapq
+import json
+import math
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import stream_stats
+from parallel_scan import partition_filters
+
+users = __import__('0-stream_users')
+batches = __import__('1-batch_processing')
+
+def _hash64(value):
+    """Stable 64-bit hash (the builtin hash() is salted per process)"""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+class HyperLogLog:
+    """
+    Approximate count of distinct values in 2 ** precision bytes
+    The standard error is about 1.04 / sqrt(2 ** precision), i.e. 0.8%
+    with the default precision of 14 (16 KiB).
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        """Adds one value"""
+        h = _hash64(value)
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        """Estimated number of distinct values added"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other):
+        """Folds another HyperLogLog of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def to_dict(self):
+        """JSON-serializable state"""
+        return {'precision': self.precision,
+                'registers': self.registers.hex()}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuilds a HyperLogLog saved with to_dict"""
+        sketch = cls(state['precision'])
+        sketch.registers = bytearray.fromhex(state['registers'])
+        return sketch
+
+class CountMinSketch:
+    """
+    Approximate frequencies in a depth x width counter table
+    Estimates never undercount; they overcount by at most
+    e / width * total with probability 1 - exp(-depth).
+    """
+
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = [array('q', bytes(8 * width)) for _ in range(depth)]
+
+    def _columns(self, value):
+        # Double hashing: depth columns from the two halves of one hash
+        h = _hash64(value)
+        h1, h2 = h & 0xFFFFFFFF, h >> 32
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, value, count=1):
+        """Adds count occurrences of value and returns its new estimate"""
+        self.total += count
+        estimate = None
+        for row, column in zip(self.table, self._columns(value)):
+            row[column] += count
+            if estimate is None or row[column] < estimate:
+                estimate = row[column]
+        return estimate
+
+    def estimate(self, value):
+        """Estimated number of occurrences of value"""
+        return min(row[column]
+                   for row, column in zip(self.table, self._columns(value)))
+
+    def merge(self, other):
+        """Folds another CountMinSketch of the same shape into this one"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge sketches of different shape")
+        for row, other_row in zip(self.table, other.table):
+            for column, count in enumerate(other_row):
+                if count:
+                    row[column] += count
+        self.total += other.total
+        return self
+
+    def to_dict(self):
+        """JSON-serializable state"""
+        return {'width': self.width, 'depth': self.depth, 'total': self.total,
+                'table': [row.tolist() for row in self.table]}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuilds a CountMinSketch saved with to_dict"""
+        sketch = cls(state['width'], state['depth'])
+        sketch.total = state['total']
+        sketch.table = [array('q', row) for row in state['table']]
+        return sketch
+
+class TopK:
+    """
+    The k most frequent values, with Misra-Gries counters
+    At most capacity values are counted. When a new value would exceed
+    that, every counter is lowered by the smallest one and the counters
+    that reach zero are dropped. Counts are therefore lower bounds that
+    are short by at most error (no more than total / (capacity + 1)), and
+    any value seen more often than that is guaranteed to be kept, however
+    uniform the rest of the stream is.
+    """
+
+    def __init__(self, k=10, capacity=4096):
+        if capacity < k:
+            raise ValueError("capacity must be at least k")
+        self.k = k
+        self.capacity = capacity
+        self.counters = {}
+        self.total = 0
+        self.error = 0
+
+    def _reduce(self):
+        # Lower every counter by the (capacity + 1)-th largest count
+        counters = self.counters
+        if len(counters) <= self.capacity:
+            return
+        cut = heapq.nlargest(self.capacity + 1, counters.values())[-1]
+        self.counters = {value: count - cut
+                         for value, count in counters.items() if count > cut}
+        self.error += cut
+
+    def add(self, value, count=1):
+        """Adds count occurrences of value"""
+        self.total += count
+        counters = self.counters
+        counters[value] = counters.get(value, 0) + count
+        if len(counters) > self.capacity:
+            self._reduce()
+
+    def top(self, k=None):
+        """List of (value, count lower bound), most frequent first"""
+        return heapq.nlargest(k or self.k, self.counters.items(),
+                              key=lambda item: item[1])
+
+    def merge(self, other):
+        """
+        Folds another TopK into this one
+        Counters are added up and reduced back to capacity, which keeps
+        the same error guarantee over the combined stream.
+        """
+        if other.capacity != self.capacity:
+            raise ValueError("Cannot merge sketches of different capacity")
+        counters = self.counters
+        for value, count in other.counters.items():
+            counters[value] = counters.get(value, 0) + count
+        self.total += other.total
+        self.error += other.error
+        self._reduce()
+        return self
+
+    def to_dict(self):
+        """JSON-serializable state"""
+        return {'k': self.k, 'capacity': self.capacity, 'total': self.total,
+                'error': self.error, 'counters': list(self.counters.items())}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuilds a TopK saved with to_dict"""
+        top = cls(state['k'], state['capacity'])
+        top.total = state['total']
+        top.error = state['error']
+        top.counters = dict(state['counters'])
+        return top
+
+class UserSketches:
+    """
+    Dashboard sketches over user_data rows
+    Tracks distinct email domains, the most frequent names and age
+    quantiles. Feed it dict rows from stream_users or batch streams.
+    """
+
+    def __init__(self, k=10, precision=14, compression=100, capacity=4096):
+        self.domains = HyperLogLog(precision)
+        self.names = TopK(k, capacity)
+        self.ages = stream_stats.TDigest(compression)
+        self.rows = 0
+
+    def add(self, user):
+        """Adds one user row"""
+        self.rows += 1
+        self.domains.add(user['email'].rpartition('@')[2].lower())
+        self.names.add(user['name'])
+        self.ages.add(float(user['age']))
+
+    def add_batch(self, rows):
+        """Adds a batch of user rows"""
+        for user in rows:
+            self.add(user)
+
+    def merge(self, other):
+        """Folds sketches built over another partition into these"""
+        self.domains.merge(other.domains)
+        self.names.merge(other.names)
+        self.ages.merge(other.ages)
+        self.rows += other.rows
+        return self
+
+    def summary(self, percentiles=(0.5, 0.9, 0.99)):
+        """Approximate dashboard figures"""
+        return {
+            'rows': self.rows,
+            'distinct_domains': self.domains.count(),
+            'top_names': self.names.top(),
+            'age_percentiles': {q: self.ages.quantile(q) for q in percentiles},
+        }
+
+    def to_dict(self):
+        """JSON-serializable state"""
+        return {'rows': self.rows, 'domains': self.domains.to_dict(),
+                'names': self.names.to_dict(), 'ages': self.ages.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuilds UserSketches saved with to_dict"""
+        sketches = cls()
+        sketches.rows = state['rows']
+        sketches.domains = HyperLogLog.from_dict(state['domains'])
+        sketches.names = TopK.from_dict(state['names'])
+        sketches.ages = stream_stats.TDigest.from_dict(state['ages'])
+        return sketches
+
+    def save(self, path):
+        """Writes the sketches to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        """Reads sketches written by save"""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+def sketch_users(batch_size=None, **settings):
+    """
+    Builds UserSketches in one pass over user_data
+    Streams single rows by default, or batches of batch_size rows.
+    settings are passed to UserSketches.
+    """
+    sketches = UserSketches(**settings)
+    if batch_size:
+        for batch in batches.stream_users_in_batches(
+                batch_size, columns=['name', 'email', 'age']):
+            sketches.add_batch(batch)
+    else:
+        for user in users.stream_users():
+            sketches.add(user)
+    return sketches
+
+def _partition_sketches(clause, params, settings):
+    """Process pool worker: sketches over one partition"""
+    query = f"SELECT name, email, age FROM user_data WHERE {clause}"
+    sketches = UserSketches(**settings)
+    for user in users._iter_rows(query, params, 1000, 'dict'):
+        sketches.add(user)
+    return sketches
+
+def parallel_sketch_users(partitions=4, mode='range', **settings):
+    """
+    Builds UserSketches with one process per partition and merges them
+    See parallel_scan.partition_filters for the partition modes.
+    """
+    filters = partition_filters(partitions, mode)
+    sketches = UserSketches(**settings)
+    with ProcessPoolExecutor(partitions) as executor:
+        futures = [executor.submit(_partition_sketches, clause, params,
+                                   settings)
+                   for clause, params in filters]
+        for future in futures:
+            sketches.merge(future.result())
+    return sketches
+
+if __name__ == "__main__":
+    print(sketch_users().summary())
@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+"""
+SQLite stand-in for the MySQL connection used by the generators
+Lets benchmarks run without a MySQL server:
+    db_pool.configure_pool(connect=sqlite_backend.connect, database=path)
+Only the subset of the MySQL Connector/Python API the generators use
+is provided.
+"""
+import re
+import sqlite3
+import zlib
+from mysql.connector import errors
+
+CREATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    age DECIMAL(5,2) NOT NULL
+)
+"""
+
+class _VarPop:
+    """VAR_POP aggregate, which SQLite lacks"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+
+    def step(self, value):
+        if value is not None:
+            self.count += 1
+            self.total += value
+            self.squares += value * value
+
+    def finalize(self):
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return self.squares / self.count - mean * mean
+
+def _translate(query):
+    """Rewrites MySQL-flavoured SQL for SQLite"""
+    query = query.replace("%s", "?")
+    query = re.sub(r"\bINSERT IGNORE\b", "INSERT OR IGNORE", query)
+    if "ON DUPLICATE KEY UPDATE" in query:
+        head, _, tail = query.partition("ON DUPLICATE KEY UPDATE")
+        tail = re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", tail)
+        query = f"{head}ON CONFLICT DO UPDATE SET{tail}"
+    return query
+
+class SQLiteCursor:
+    """Cursor with the MySQL Connector/Python calls the generators make"""
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=()):
+        try:
+            self._cursor.execute(_translate(query), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise errors.DatabaseError(str(e))
+
+    def executemany(self, query, seq_params):
+        try:
+            self._cursor.executemany(_translate(query), seq_params)
+        except sqlite3.Error as e:
+            raise errors.DatabaseError(str(e))
+
+    def _convert(self, rows):
+        if not self._dictionary:
+            return rows
+        names = self.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        return self._convert([row])[0]
+
+    def fetchmany(self, size=1):
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+class SQLiteConnection:
+    """Connection object accepted by db_pool and the generators"""
+
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.create_aggregate("VAR_POP", 1, _VarPop)
+        self._connection.create_function(
+            "CRC32", 1, lambda value: zlib.crc32(str(value).encode()))
+        self._connection.create_function("MOD", 2, lambda a, b: a % b)
+        self._connected = True
+
+    def cursor(self, dictionary=False, buffered=None):
+        if not self._connected:
+            raise errors.InterfaceError("Connection is closed")
+        return SQLiteCursor(self._connection, dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def is_connected(self):
+        return self._connected
+
+    def reconnect(self, attempts=1, delay=0):
+        self.close()
+        self._open()
+
+    def close(self):
+        if self._connected:
+            self._connection.close()
+            self._connected = False
+
+    shutdown = close
+
+def connect(database, **_):
+    """Opens the SQLite file named by database; MySQL options are ignored"""
+    return SQLiteConnection(database)
+
+def create_table(connection):
+    """Creates user_data in an SQLite database"""
+    cursor = connection.cursor()
+    cursor.execute(CREATE_TABLE_QUERY)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_age ON user_data (age)")
+    connection.commit()
+    cursor.close()
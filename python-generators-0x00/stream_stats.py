@@ -0,0 +1,283 @@
+#!/usr/bin/python3
+"""
+One-pass streaming statistics over user ages
+"""
+import math
+
+stream_ages = __import__('4-stream_ages')
+
+class RunningStats:
+    """
+    Count, mean, variance, min and max in O(1) memory
+    Uses Welford's update; two instances can be merged (Chan et al.),
+    so partial results from separate scans combine exactly.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Adds one value"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Folds another RunningStats into this one"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @classmethod
+    def from_array(cls, values):
+        """Builds the statistics of a NumPy array with vectorized reductions"""
+        stats = cls()
+        if len(values):
+            stats.count = int(values.size)
+            stats.mean = float(values.mean())
+            stats.m2 = float(((values - stats.mean) ** 2).sum())
+            stats.min = float(values.min())
+            stats.max = float(values.max())
+        return stats
+
+    @property
+    def variance(self):
+        """Population variance"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def stdev(self):
+        """Population standard deviation"""
+        return math.sqrt(self.variance)
+
+class TDigest:
+    """
+    Approximate quantiles in bounded memory (merging t-digest)
+    Values are buffered and periodically merged into centroids whose
+    size shrinks towards the tails, so extreme percentiles stay accurate.
+    Memory is O(compression) whatever the number of values.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.centroids = []
+        self.buffer = []
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value, weight=1):
+        """Adds a value with the given weight"""
+        self.buffer.append((value, weight))
+        self.count += weight
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if len(self.buffer) >= self.compression * 5:
+            self._compress()
+
+    def add_array(self, values):
+        """
+        Adds a NumPy array of values
+        The sorted array is cut into groups along the k1 scale and each
+        group enters the digest as one centroid, all with vectorized
+        operations; tail groups hold single values.
+        """
+        import numpy as np
+
+        if not len(values):
+            return
+        ordered = np.sort(values)
+        n = ordered.size
+        k = np.arange(-self.compression / 4, self.compression / 4 + 1)
+        q = (np.sin(2 * math.pi * k / self.compression) + 1) / 2
+        # The few most extreme values on each side stay singletons
+        tails = np.arange(min(n, 8))
+        starts = np.unique(np.concatenate(
+            ([0], tails, n - 1 - tails, (q * n).astype(np.int64))))
+        starts = starts[starts < n]
+        sums = np.add.reduceat(ordered, starts)
+        weights = np.diff(np.append(starts, n))
+        self.buffer.extend(zip((sums / weights).tolist(), weights.tolist()))
+        self.count += n
+        low, high = float(ordered[0]), float(ordered[-1])
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self._compress()
+
+    def merge(self, other):
+        """Folds another TDigest into this one"""
+        if other.count == 0:
+            return self
+        self.buffer.extend(other.centroids)
+        self.buffer.extend(other.buffer)
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def to_dict(self):
+        """JSON-serializable state (buffered values are merged first)"""
+        self._compress()
+        return {'compression': self.compression, 'count': self.count,
+                'min': self.min, 'max': self.max,
+                'centroids': [list(centroid) for centroid in self.centroids]}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuilds a TDigest saved with to_dict"""
+        digest = cls(state['compression'])
+        digest.count = state['count']
+        digest.min = state['min']
+        digest.max = state['max']
+        digest.centroids = [tuple(centroid) for centroid in state['centroids']]
+        return digest
+
+    def _scale(self, q):
+        """k1 scale function: small centroids near the tails"""
+        q = min(q, 1.0)
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self):
+        """Merges buffered values into the centroid list"""
+        if not self.buffer:
+            return
+        items = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        total = self.count
+        merged = []
+        mean, weight = items[0]
+        seen = 0
+        k_left = self._scale(0.0)
+        for value, value_weight in items[1:]:
+            # A centroid may span at most one unit of the k1 scale
+            k_right = self._scale((seen + weight + value_weight) / total)
+            if k_right - k_left <= 1:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                merged.append((mean, weight))
+                seen += weight
+                k_left = self._scale(seen / total)
+                mean, weight = value, value_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0 <= q <= 1)"""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        target = q * self.count
+        # Interpolate between centroid centres, anchored at min and max
+        previous_position, previous_mean = 0.0, self.min
+        cumulative = 0.0
+        for mean, weight in self.centroids:
+            position = cumulative + weight / 2
+            if target < position:
+                span = position - previous_position
+                fraction = (target - previous_position) / span if span else 0
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_position, previous_mean = position, mean
+            cumulative += weight
+        span = self.count - previous_position
+        fraction = (target - previous_position) / span if span else 1
+        return previous_mean + fraction * (self.max - previous_mean)
+
+def summarize(values, percentiles=(0.5, 0.9, 0.99), compression=100):
+    """
+    Computes count, mean, variance, min/max and percentiles in one pass
+    values can be any iterable, e.g. stream_user_ages()
+    """
+    stats = RunningStats()
+    digest = TDigest(compression)
+    for value in values:
+        stats.add(value)
+        digest.add(value)
+    return build_summary(stats, digest, percentiles)
+
+def build_summary(stats, digest, percentiles):
+    """Result dictionary for merged RunningStats and TDigest accumulators"""
+    return {
+        'count': stats.count,
+        'mean': stats.mean if stats.count else None,
+        'variance': stats.variance,
+        'stdev': stats.stdev,
+        'min': stats.min,
+        'max': stats.max,
+        'percentiles': {q: digest.quantile(q) for q in percentiles},
+    }
+
+def summarize_chunks(chunks, percentiles=(0.5, 0.9, 0.99),
+                     bin_edges=tuple(range(0, 130, 10)), compression=100):
+    """
+    Vectorized version of summarize for NumPy chunks
+    chunks can be any iterable of arrays, e.g. stream_user_age_chunks().
+    Each chunk is reduced with NumPy and the partial results are merged,
+    so the Python loop runs once per chunk rather than once per row.
+    The histogram maps each lower edge to its count; the last bucket is
+    open-ended and values below the first edge are counted under None.
+    """
+    import numpy as np
+
+    stats = RunningStats()
+    digest = TDigest(compression)
+    edges = np.asarray(bin_edges, dtype=np.float64)
+    counts = np.zeros(len(edges) + 1, dtype=np.int64)
+    for chunk in chunks:
+        stats.merge(RunningStats.from_array(chunk))
+        digest.add_array(chunk)
+        buckets = np.searchsorted(edges, chunk, side='right')
+        counts += np.bincount(buckets, minlength=len(counts))
+
+    summary = build_summary(stats, digest, percentiles)
+    summary['histogram'] = dict(zip([None] + list(bin_edges),
+                                    counts.tolist()))
+    return summary
+
+def age_statistics(percentiles=(0.5, 0.9, 0.99), push_down=None,
+                   vectorized=False):
+    """
+    Statistics over user_data ages
+    Simple statistics (no percentiles) are pushed down to the server as
+    COUNT/AVG/VAR_POP/MIN/MAX by default; percentiles need the one-pass
+    stream over stream_user_ages. Pass push_down to force either mode.
+    vectorized=True streams NumPy chunks instead of single ages.
+    """
+    if push_down is None:
+        push_down = not percentiles
+    if push_down:
+        if percentiles:
+            raise ValueError("Percentiles cannot be pushed down")
+        return stream_ages.server_age_stats()
+    if vectorized:
+        return summarize_chunks(stream_ages.stream_user_age_chunks(),
+                                percentiles)
+    return summarize(stream_ages.stream_user_ages(), percentiles)
+
+if __name__ == "__main__":
+    print(age_statistics())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Unit tests for 1-batch_processing module
+"""
+
+import os
+import tempfile
+import unittest
+from parameterized import parameterized
+import db_pool
+import sqlite_backend
+
+batches = __import__('1-batch_processing')
+compile_filter = batches.compile_filter
+
+USERS = [
+    ('u1', 'Ada', 'ada@example.com', 17),
+    ('u2', 'Ben', 'ben@example.com', 25),
+    ('u3', 'Cy', 'cy@example.com', 26),
+    ('u4', 'Adele', 'adele@example.com', 40),
+    ('u5', 'Ad_m', 'adm@example.com', 99),
+]
+
+
+class TestCompileFilter(unittest.TestCase):
+    """Test cases for compile_filter"""
+
+    @parameterized.expand([
+        (None, "", ()),
+        ({}, "", ()),
+        ({'age': 30}, "WHERE age = %s", (30,)),
+        ({'age__exact': 30}, "WHERE age = %s", (30,)),
+        ({'age__gt': 25, 'age__lte': 40},
+         "WHERE age > %s AND age <= %s", (25, 40)),
+        ({'name__in': ['Ada', 'Cy']}, "WHERE name IN (%s, %s)",
+         ('Ada', 'Cy')),
+        ({'name__in': []}, "WHERE FALSE", ()),
+        ({'name__startswith': 'Ad'}, "WHERE name LIKE %s ESCAPE '!'",
+         ('Ad%',)),
+        ({'name__startswith': '5%_a!\\'}, "WHERE name LIKE %s ESCAPE '!'",
+         ('5!%!_a!!\\%',)),
+    ])
+    def test_compile_filter(self, where, clause, params):
+        """Test lookups compile to parameterized conditions"""
+        self.assertEqual(compile_filter(where), (clause, params))
+
+    @parameterized.expand([
+        ({'password': 'x'},),
+        ({'age__between': (1, 2)},),
+        ({'age; DROP TABLE user_data': 1},),
+    ])
+    def test_compile_filter_rejects(self, where):
+        """Test unknown columns and lookups raise ValueError"""
+        with self.assertRaises(ValueError):
+            compile_filter(where)
+
+    def test_values_are_never_inlined(self):
+        """Test values only travel as parameters"""
+        clause, params = compile_filter({'name': "x' OR '1'='1"})
+        self.assertNotIn("OR", clause)
+        self.assertEqual(params, ("x' OR '1'='1",))
+
+
+class TestFilteredBatches(unittest.TestCase):
+    """Test cases for stream_users_in_batches with a pushed-down filter"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Points the pool at a scratch SQLite database of USERS"""
+        cls.directory = tempfile.TemporaryDirectory()
+        db_pool.configure_pool(
+            connect=sqlite_backend.connect,
+            database=os.path.join(cls.directory.name, "users.sqlite3"))
+        connection = db_pool.connect_to_prodev()
+        sqlite_backend.create_table(connection)
+        cursor = connection.cursor()
+        cursor.executemany("INSERT INTO user_data VALUES (%s, %s, %s, %s)",
+                           USERS)
+        connection.commit()
+        cursor.close()
+        connection.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Closes the pooled connections and removes the database"""
+        db_pool.get_pool().close_all()
+        db_pool.configure_pool()
+        cls.directory.cleanup()
+
+    @parameterized.expand([
+        ({'age__gt': 25}, lambda user: user[3] > 25),
+        ({'age__gte': 25, 'age__lt': 99},
+         lambda user: 25 <= user[3] < 99),
+        ({'name__in': ['Ada', 'Cy', 'Zed']},
+         lambda user: user[1] in ('Ada', 'Cy', 'Zed')),
+        ({'name__in': []}, lambda user: False),
+        ({'user_id': 'u4'}, lambda user: user[0] == 'u4'),
+        ({'name__startswith': 'Ad'}, lambda user: user[1].startswith('Ad')),
+        ({'name__startswith': 'Ad_'},
+         lambda user: user[1].startswith('Ad_')),
+        ({'name__startswith': 'A%'}, lambda user: False),
+    ])
+    def test_filter_matches_python(self, where, predicate):
+        """Test the server returns the rows the Python predicate keeps"""
+        streamed = [user['user_id']
+                    for batch in batches.stream_users_in_batches(2,
+                                                                 where=where)
+                    for user in batch]
+        expected = [user[0] for user in USERS if predicate(user)]
+        self.assertEqual(sorted(streamed), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
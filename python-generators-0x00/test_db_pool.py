@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Unit tests for db_pool module
+"""
+
+import gc
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+from mysql.connector import errors
+import db_pool
+from db_pool import ConnectionPool, close_stream
+
+
+class FakeConnection:
+    """Stand-in for a MySQL connection that records what was done to it"""
+
+    def __init__(self, **config):
+        """Starts connected, outside a transaction"""
+        self.config = config
+        self.alive = True
+        self.in_transaction = False
+        self.fail_rollback = False
+        self.rollbacks = 0
+        self.closed = False
+        self.shut_down = False
+
+    def is_connected(self):
+        """Whether the fake server is still there"""
+        return self.alive
+
+    def rollback(self):
+        """Ends the transaction, or fails like a dropped connection"""
+        if self.fail_rollback:
+            raise errors.OperationalError("Lost connection")
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        """Marks the connection closed"""
+        self.closed = True
+
+    def shutdown(self):
+        """Marks the connection shut down"""
+        self.shut_down = True
+
+
+class FakeFactory:
+    """connect= callable that keeps every connection it opens"""
+
+    def __init__(self):
+        """No connections opened yet"""
+        self.opened = []
+        self.fail = False
+
+    def __call__(self, **config):
+        """Opens a FakeConnection, or fails like an unreachable server"""
+        if self.fail:
+            raise errors.InterfaceError("Can't connect to MySQL server")
+        connection = FakeConnection(**config)
+        self.opened.append(connection)
+        return connection
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test cases for ConnectionPool"""
+
+    def setUp(self):
+        """A pool of fake connections"""
+        self.factory = FakeFactory()
+
+    def pool(self, **settings):
+        """ConnectionPool over the fake factory"""
+        return ConnectionPool(connect=self.factory, **settings)
+
+    def test_reuses_released_connections(self):
+        """Test a released connection is handed out again"""
+        pool = self.pool(database='test_db')
+        pool.get_connection().close()
+        connection = pool.get_connection()
+        self.assertIs(connection._connection, self.factory.opened[0])
+        self.assertEqual(self.factory.opened[0].config['database'], 'test_db')
+        stats = pool.stats()
+        self.assertEqual((stats['connects'], stats['checkouts'],
+                          stats['size'], stats['idle']), (1, 2, 1, 0))
+
+    def test_timeout_when_full(self):
+        """Test PoolError once max_size connections are out"""
+        pool = self.pool(max_size=2)
+        held = [pool.get_connection(), pool.get_connection()]
+        start = time.perf_counter()
+        with self.assertRaises(errors.PoolError):
+            pool.get_connection(timeout=0.05)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+        self.assertEqual(pool.stats()['size'], 2)
+        self.assertEqual(len(held), 2)
+
+    def test_waits_for_a_release(self):
+        """Test a waiting checkout gets the released slot and is counted"""
+        pool = self.pool(max_size=1)
+        connection = pool.get_connection()
+        timer = threading.Timer(0.1, connection.close)
+        timer.start()
+        borrowed = pool.get_connection(timeout=5)
+        timer.join()
+        self.assertIs(borrowed._connection, self.factory.opened[0])
+        stats = pool.stats()
+        self.assertEqual((stats['waits'], stats['connects']), (1, 1))
+        self.assertGreaterEqual(stats['wait_seconds'], 0.05)
+        self.assertEqual(stats['max_wait_seconds'], stats['wait_seconds'])
+
+    def test_evicts_idle_connections(self):
+        """Test connections idle past idle_timeout are closed, not reused"""
+        pool = self.pool(idle_timeout=0.01)
+        pool.get_connection().close()
+        time.sleep(0.02)
+        connection = pool.get_connection()
+        self.assertTrue(self.factory.opened[0].closed)
+        self.assertIs(connection._connection, self.factory.opened[1])
+        stats = pool.stats()
+        self.assertEqual((stats['evicted'], stats['size']), (1, 1))
+
+    def test_discards_dead_connections_on_checkout(self):
+        """Test validation replaces an idle connection that went away"""
+        pool = self.pool()
+        pool.get_connection().close()
+        self.factory.opened[0].alive = False
+        connection = pool.get_connection()
+        self.assertTrue(self.factory.opened[0].closed)
+        self.assertIs(connection._connection, self.factory.opened[1])
+        stats = pool.stats()
+        self.assertEqual((stats['discarded'], stats['size']), (1, 1))
+
+    def test_no_validation(self):
+        """Test validate=False hands out idle connections unchecked"""
+        pool = self.pool(validate=False)
+        pool.get_connection().close()
+        self.factory.opened[0].alive = False
+        connection = pool.get_connection()
+        self.assertIs(connection._connection, self.factory.opened[0])
+
+    def test_release_rolls_back(self):
+        """Test an open transaction is rolled back before reuse"""
+        pool = self.pool()
+        connection = pool.get_connection()
+        self.factory.opened[0].in_transaction = True
+        connection.close()
+        self.assertEqual(self.factory.opened[0].rollbacks, 1)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_release_discards_when_rollback_fails(self):
+        """Test a connection that cannot roll back is dropped"""
+        pool = self.pool()
+        connection = pool.get_connection()
+        self.factory.opened[0].in_transaction = True
+        self.factory.opened[0].fail_rollback = True
+        connection.close()
+        self.assertTrue(self.factory.opened[0].closed)
+        stats = pool.stats()
+        self.assertEqual((stats['discarded'], stats['size'], stats['idle']),
+                         (1, 0, 0))
+
+    def test_garbage_collected_borrow_is_discarded(self):
+        """Test a leaked borrow frees its slot when collected"""
+        pool = self.pool(max_size=1)
+        connection = pool.get_connection()
+        del connection
+        gc.collect()
+        self.assertTrue(self.factory.opened[0].shut_down)
+        stats = pool.stats()
+        self.assertEqual((stats['discarded'], stats['size']), (1, 0))
+        pool.get_connection(timeout=0.1)
+
+    def test_closed_borrow_is_not_discarded_again(self):
+        """Test returning a borrow detaches its finalizer"""
+        pool = self.pool()
+        connection = pool.get_connection()
+        connection.close()
+        del connection
+        gc.collect()
+        stats = pool.stats()
+        self.assertEqual((stats['discarded'], stats['idle']), (0, 1))
+
+    def test_shutdown_drops_the_connection(self):
+        """Test shutdown frees the slot without reusing the connection"""
+        pool = self.pool()
+        connection = pool.get_connection()
+        connection.shutdown()
+        self.assertTrue(self.factory.opened[0].shut_down)
+        self.assertEqual(pool.stats()['size'], 0)
+        with self.assertRaises(errors.InterfaceError):
+            connection.is_connected()
+
+    def test_failed_connect_frees_the_slot(self):
+        """Test a connect error does not use up a slot"""
+        pool = self.pool(max_size=1)
+        self.factory.fail = True
+        with self.assertRaises(errors.InterfaceError):
+            pool.get_connection()
+        self.factory.fail = False
+        connection = pool.get_connection(timeout=0.1)
+        self.assertIs(connection._connection, self.factory.opened[0])
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_close_all(self):
+        """Test close_all closes idle connections and frees their slots"""
+        pool = self.pool()
+        first, second = pool.get_connection(), pool.get_connection()
+        first.close()
+        pool.close_all()
+        self.assertTrue(self.factory.opened[0].closed)
+        self.assertFalse(self.factory.opened[1].closed)
+        self.assertEqual(pool.stats()['size'], 1)
+        second.close()
+
+
+class TestSharedPool(unittest.TestCase):
+    """Test cases for configure_pool and connect_to_prodev"""
+
+    def tearDown(self):
+        """Restores the default pool settings"""
+        db_pool.configure_pool()
+
+    def test_connect_to_prodev_times_out(self):
+        """Test connect_to_prodev returns None when no slot frees up"""
+        db_pool.configure_pool(connect=FakeFactory(), max_size=1)
+        held = db_pool.connect_to_prodev()
+        self.assertIsNotNone(held)
+        self.assertIsNone(db_pool.connect_to_prodev(timeout=0.05))
+        held.close()
+        self.assertIsNotNone(db_pool.connect_to_prodev(timeout=0.05))
+
+
+class TestCloseStream(unittest.TestCase):
+    """Test cases for close_stream"""
+
+    def test_exhausted_stream_is_returned(self):
+        """Test a fully read stream closes its cursor and connection"""
+        connection, cursor = Mock(), Mock()
+        close_stream(connection, cursor, True)
+        cursor.close.assert_called_once_with()
+        connection.close.assert_called_once_with()
+        connection.shutdown.assert_not_called()
+
+    def test_unfinished_stream_is_shut_down(self):
+        """Test a stream closed early drops its connection"""
+        connection, cursor = Mock(), Mock()
+        close_stream(connection, cursor, False)
+        connection.shutdown.assert_called_once_with()
+        cursor.close.assert_not_called()
+        connection.close.assert_not_called()
+
+    def test_failed_close_shuts_down(self):
+        """Test a cursor that fails to close does not keep its slot"""
+        connection, cursor = Mock(), Mock()
+        cursor.close.side_effect = errors.InternalError("Unread result found")
+        close_stream(connection, cursor, True)
+        connection.shutdown.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Unit tests for external_sort module
+"""
+
+import random
+import unittest
+from operator import itemgetter
+from parameterized import parameterized
+from external_sort import external_sort
+
+
+class TestExternalSort(unittest.TestCase):
+    """Test cases for external_sort"""
+
+    def setUp(self):
+        """Rows with many equal keys, tagged with their input position"""
+        rng = random.Random(0)
+        self.rows = [(rng.randrange(20), position)
+                     for position in range(1000)]
+
+    @parameterized.expand([
+        ("in_memory", 5000, 64),
+        ("single_merge", 100, 64),
+        ("two_passes", 30, 4),
+        ("many_passes", 7, 2),
+    ])
+    def test_matches_sorted(self, _, run_size, max_runs):
+        """Test the output equals sorted() whatever the number of passes"""
+        result = list(external_sort(self.rows, key=itemgetter(0),
+                                    run_size=run_size, max_runs=max_runs,
+                                    block_size=3))
+        self.assertEqual(result, sorted(self.rows, key=itemgetter(0)))
+
+    @parameterized.expand([
+        ("single_merge", 100, 64),
+        ("many_passes", 7, 2),
+    ])
+    def test_reverse_is_stable(self, _, run_size, max_runs):
+        """Test reverse=True keeps equal keys in input order, like sorted()"""
+        result = list(external_sort(self.rows, key=itemgetter(0),
+                                    reverse=True, run_size=run_size,
+                                    max_runs=max_runs, block_size=3))
+        self.assertEqual(result, sorted(self.rows, key=itemgetter(0),
+                                        reverse=True))
+
+    def test_without_key(self):
+        """Test plain values sort with the default key"""
+        values = [5, 3, 9, 1, 3, 7, 0, 2]
+        self.assertEqual(list(external_sort(values, run_size=2, max_runs=2)),
+                         sorted(values))
+
+    def test_empty_input(self):
+        """Test an empty stream yields nothing"""
+        self.assertEqual(list(external_sort([], run_size=2)), [])
+
+    def test_exact_multiple_of_run_size(self):
+        """Test inputs that fill the last run exactly lose no rows"""
+        values = list(range(40, 0, -1))
+        self.assertEqual(list(external_sort(values, run_size=10,
+                                            max_runs=2)),
+                         sorted(values))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Unit tests for fast_csv module
+"""
+
+import os
+import tempfile
+import unittest
+from parameterized import parameterized
+import fast_csv
+import seed
+
+HEADER = "user_id,name,email,age"
+
+FILES = {
+    'unquoted': [
+        HEADER,
+        "a1,Ada Obi,ada@example.com,34",
+        "a2,Ben Li,ben@example.com,71.5",
+    ],
+    'quoted': [
+        '"user_id","name","email","age"',
+        '"b1","Cy Doe","cy@example.com","28"',
+        '"b2","Di Fox","di@example.com","45.25"',
+    ],
+    'mixed_quoting': [
+        HEADER,
+        'c1,"Doe, Jane",jane@example.com,30',
+        'c2,"O""Brien",ob@example.com,40',
+        '"c3","Plain","p@example.com","50"',
+        '"c4","Doe, Jo","jo@example.com","60"',
+        '"c5","a"",""b","ab@example.com","70"',
+    ],
+    'no_user_id': [
+        "name,email,age",
+        "Eve Kim,eve@example.com,22",
+        '"Fay Roe","fay@example.com","63"',
+    ],
+    'unicode_separators': [
+        HEADER,
+        'e1,"Ann\x85Lee",ann@example.com,31',
+        'e2,Bo\u2028Wu,bo@example.com,32',
+        'e3,"Cal\x0bDay\x0cEly\x1cFin\x1dGil\x1eHo",cal@example.com,33',
+    ],
+    'empty_lines': [
+        HEADER,
+        "d1,Gus Ng,gus@example.com,19",
+        "",
+        "d2,Hal Ito,hal@example.com,88",
+    ],
+}
+
+
+class TestReadMmapChunks(unittest.TestCase):
+    """Test cases for read_mmap_chunks parity with seed.read_csv_chunks"""
+
+    def setUp(self):
+        """Temporary directory for the CSV files"""
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Removes the CSV files"""
+        self.directory.cleanup()
+
+    def write(self, lines, newline="\n", trailing=True):
+        """Writes lines to a CSV file and returns its path"""
+        path = os.path.join(self.directory.name, "users.csv")
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            file.write(newline.join(lines) + (newline if trailing else ""))
+        return path
+
+    def assert_parity(self, path, chunk_size, block_size):
+        """Checks both readers yield the same chunks"""
+        expected = list(seed.read_csv_chunks(path, chunk_size))
+        result = list(fast_csv.read_mmap_chunks(path, chunk_size,
+                                                block_size=block_size))
+        self.assertEqual(result, expected)
+
+    @parameterized.expand([
+        (name, newline, trailing, block_size)
+        for name in FILES
+        for newline in ("\n", "\r\n")
+        for trailing in (True, False)
+        for block_size in (1, 16, 1 << 22)
+    ])
+    def test_parity(self, name, newline, trailing, block_size):
+        """Test every file layout parses like csv.DictReader"""
+        path = self.write(FILES[name], newline, trailing)
+        self.assert_parity(path, 2, block_size)
+
+    @parameterized.expand([(1,), (7,), (1000,)])
+    def test_generated_file(self, chunk_size):
+        """Test a generate_user_data CSV with chunks of several sizes"""
+        import generate_user_data
+        path = os.path.join(self.directory.name, "generated.csv")
+        generate_user_data.write_csv(path, 500, seed=3)
+        self.assert_parity(path, chunk_size, 4096)
+
+    def test_stats(self):
+        """Test ParseStats counts every row and byte"""
+        path = self.write(FILES['unquoted'])
+        stats = fast_csv.ParseStats()
+        list(fast_csv.read_csv_columns(path, stats=stats))
+        self.assertEqual(stats.rows, 2)
+        self.assertEqual(stats.bytes, os.path.getsize(path))
+
+    def test_empty_file(self):
+        """Test an empty file yields nothing"""
+        path = self.write([], trailing=False)
+        self.assertEqual(list(fast_csv.read_mmap_chunks(path)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Unit tests for pipeline module
+"""
+
+import unittest
+from parameterized import parameterized
+from pipeline import Pipeline
+
+
+class TestFusion(unittest.TestCase):
+    """Test cases for fused map/filter/flatten stages"""
+
+    def test_flatten_between_maps_and_filters(self):
+        """Test a fused chain matches the equivalent plain Python"""
+        pipeline = (Pipeline(range(20))
+                    .map(lambda x: [x] * (x % 3))
+                    .flatten()
+                    .filter(lambda x: x % 2)
+                    .map(lambda x: x * 10))
+        expected = [x * 10 for x in range(20) for _ in range(x % 3)
+                    if x % 2]
+        self.assertEqual(pipeline.collect(), expected)
+
+    def test_nested_flatten(self):
+        """Test two flatten stages unpack two levels of nesting"""
+        source = [[[1, 2], [3]], [], [[4], [], [5, 6]]]
+        pipeline = Pipeline(source).flatten().flatten()
+        self.assertEqual(pipeline.collect(), [1, 2, 3, 4, 5, 6])
+
+    def test_fused_stage_counts(self):
+        """Test adjacent stages run as one stage with in/out counts"""
+        pipeline = (Pipeline([[1, 2, 3], [4], [5, 6]])
+                    .flatten()
+                    .filter(lambda x: x > 2)
+                    .batch(2))
+        self.assertEqual(pipeline.collect(), [[3, 4], [5, 6]])
+        stats = pipeline.stats()
+        self.assertEqual([stage['stage'] for stage in stats],
+                         ['source', 'flatten+filter', 'batch'])
+        self.assertEqual((stats[1]['items_in'], stats[1]['items_out']),
+                         (3, 4))
+        self.assertEqual((stats[2]['items_in'], stats[2]['items_out']),
+                         (4, 2))
+
+    def test_pipeline_can_run_twice(self):
+        """Test a pipeline over a callable source runs again from scratch"""
+        pipeline = Pipeline(lambda: iter(range(5))).map(lambda x: x + 1)
+        self.assertEqual(pipeline.collect(), [1, 2, 3, 4, 5])
+        self.assertEqual(pipeline.collect(), [1, 2, 3, 4, 5])
+
+
+class TestWindow(unittest.TestCase):
+    """Test cases for the window stage"""
+
+    @parameterized.expand([
+        (10, 3, None),
+        (10, 3, 1),
+        (10, 3, 2),
+        (10, 2, 5),
+        (10, 4, 4),
+        (2, 3, 1),
+        (0, 3, 1),
+    ])
+    def test_window(self, count, size, step):
+        """Test windows start every step items and are always full"""
+        items = list(range(count))
+        stride = step or size
+        expected = [items[start:start + size]
+                    for start in range(0, count - size + 1, stride)]
+        pipeline = Pipeline(items).window(size, step)
+        self.assertEqual(pipeline.collect(), expected)
+
+    def test_windows_are_independent(self):
+        """Test overlapping windows do not share a list"""
+        windows = Pipeline(range(5)).window(3, 1).collect()
+        windows[0].append('x')
+        self.assertEqual(windows[1], [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
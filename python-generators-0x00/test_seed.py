@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Unit tests for seed module
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from parameterized import parameterized
+import db_pool
+import sqlite_backend
+from mysql.connector import errors
+from seed import (bulk_insert_data, parallel_insert_data, read_csv_chunks,
+                  read_csv_range_chunks, resumable_insert_data, split_csv)
+
+
+class TestSplitCsv(unittest.TestCase):
+    """Test cases for split_csv"""
+
+    def setUp(self):
+        """Temporary directory for the CSV files"""
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Removes the CSV files"""
+        self.directory.cleanup()
+
+    def write(self, rows, trailing=True):
+        """Writes a user_data CSV with rows data lines of varying length"""
+        path = os.path.join(self.directory.name, "users.csv")
+        lines = ["user_id,name,email,age"]
+        lines += [f"id{i},{'n' * (i % 13)},u{i}@example.com,{i % 90}"
+                  for i in range(rows)]
+        with open(path, 'w', newline='') as file:
+            file.write("\n".join(lines) + ("\n" if trailing else ""))
+        return path
+
+    @parameterized.expand([
+        (rows, parts, trailing)
+        for rows in (0, 1, 5, 200)
+        for parts in (1, 2, 3, 7, 64, 500)
+        for trailing in (True, False)
+    ])
+    def test_ranges_cover_every_line(self, rows, parts, trailing):
+        """Test the ranges tile the data and read back every row once"""
+        path = self.write(rows, trailing)
+        fieldnames, ranges = split_csv(path, parts)
+        self.assertEqual(fieldnames, ['user_id', 'name', 'email', 'age'])
+
+        if ranges:
+            with open(path, 'rb') as file:
+                file.readline()
+                self.assertEqual(ranges[0][0], file.tell())
+            self.assertEqual(ranges[-1][1], os.path.getsize(path))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+
+        loaded = [row
+                  for start, end in ranges
+                  for chunk in read_csv_range_chunks(path, fieldnames,
+                                                     start, end, 10)
+                  for row in chunk]
+        expected = [row for chunk in read_csv_chunks(path, 10)
+                    for row in chunk]
+        self.assertEqual(loaded, expected)
+        self.assertEqual(len(loaded), rows)
+
+    def test_header_only(self):
+        """Test a file with no data lines has no ranges"""
+        path = self.write(0)
+        self.assertEqual(split_csv(path, 4)[1], [])
+
+
+class TestParallelInsertData(unittest.TestCase):
+    """Test cases for parallel_insert_data on the SQLite stand-in"""
+
+    def setUp(self):
+        """Temporary directory for the CSV files and databases"""
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Resets the pool and removes the files"""
+        db_pool.get_pool().close_all()
+        db_pool.configure_pool()
+        self.directory.cleanup()
+
+    def use_database(self, name):
+        """Points the pool at a new SQLite database with user_data"""
+        db_pool.configure_pool(
+            connect=sqlite_backend.connect,
+            database=os.path.join(self.directory.name, name))
+        connection = db_pool.connect_to_prodev()
+        sqlite_backend.create_table(connection)
+        return connection
+
+    def table(self):
+        """Every user_data row, ordered by user_id"""
+        connection = db_pool.connect_to_prodev()
+        cursor = connection.cursor()
+        cursor.execute("SELECT user_id, name, email, age FROM user_data "
+                       "ORDER BY user_id")
+        rows = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return rows
+
+    def write(self, rows):
+        """Writes a CSV in which user_ids repeat with different values"""
+        rng = random.Random(5)
+        path = os.path.join(self.directory.name, "users.csv")
+        with open(path, 'w', newline='') as file:
+            file.write("user_id,name,email,age\n")
+            for i in range(rows):
+                user_id = f"id{rng.randrange(rows // 3)}"
+                file.write(f"{user_id},name{i},u{i}@example.com,{i % 90}\n")
+        return path
+
+    @parameterized.expand([('ignore',), ('update',)])
+    def test_matches_serial_load(self, on_duplicate):
+        """Test repeated user_ids resolve as in a serial bulk load"""
+        path = self.write(3000)
+        connection = self.use_database("serial.sqlite3")
+        bulk_insert_data(connection, path, chunk_size=100,
+                         on_duplicate=on_duplicate)
+        connection.close()
+        serial = self.table()
+
+        self.use_database("parallel.sqlite3").close()
+        total, failures = parallel_insert_data(path, workers=3,
+                                               chunk_size=100,
+                                               on_duplicate=on_duplicate)
+        self.assertEqual((total, failures), (3000, []))
+        self.assertEqual(self.table(), serial)
+
+    def test_worker_errors_are_reported(self):
+        """Test a worker exception becomes a failure, not an abort"""
+        path = os.path.join(self.directory.name, "bad.csv")
+        with open(path, 'wb') as file:
+            file.write(b"user_id,name,email,age\nid1,\xff\xfe,x@y.z,3\n")
+        self.use_database("bad.sqlite3").close()
+        total, failures = parallel_insert_data(path, workers=2)
+        self.assertEqual(total, 0)
+        self.assertEqual(sorted(failure['partition'] for failure in failures),
+                         [0, 1])
+        self.assertTrue(all(failure['error'].startswith('UnicodeDecodeError')
+                            for failure in failures))
+
+
+class DroppedConnection:
+    """Connection whose server goes away once the load starts"""
+
+    def __init__(self, connection):
+        """Wraps a working connection"""
+        self.connection = connection
+
+    def cursor(self, **kwargs):
+        """Cursor whose inserts fail as if the server went away"""
+        cursor = self.connection.cursor(**kwargs)
+
+        def executemany(query, seq_params):
+            raise errors.OperationalError("Lost connection to MySQL server")
+        cursor.executemany = executemany
+        return cursor
+
+    def commit(self):
+        """Commits on the wrapped connection"""
+        self.connection.commit()
+
+    def rollback(self):
+        """Fails like a rollback on a dropped connection"""
+        raise errors.OperationalError("MySQL Connection not available")
+
+
+class TestResumableInsertData(unittest.TestCase):
+    """Test cases for resumable_insert_data on the SQLite stand-in"""
+
+    def setUp(self):
+        """A scratch database and a CSV with blank lines"""
+        self.directory = tempfile.TemporaryDirectory()
+        db_pool.configure_pool(
+            connect=sqlite_backend.connect,
+            database=os.path.join(self.directory.name, "users.sqlite3"))
+        self.connection = db_pool.connect_to_prodev()
+        sqlite_backend.create_table(self.connection)
+        self.path = os.path.join(self.directory.name, "users.csv")
+        lines = ["user_id,name,email,age"]
+        for i in range(10):
+            lines.append(f"id{i},name{i},u{i}@example.com,{20 + i}")
+            if i % 3 == 0:
+                lines.append("")
+        with open(self.path, 'w', newline='') as file:
+            file.write("\n".join(lines) + "\n")
+        self.lines = len(lines)
+
+    def tearDown(self):
+        """Closes the connection and removes the files"""
+        self.connection.close()
+        db_pool.get_pool().close_all()
+        db_pool.configure_pool()
+        self.directory.cleanup()
+
+    def checkpoint(self):
+        """The stored (byte_offset, line_number) of the CSV"""
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT byte_offset, line_number FROM seed_progress")
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+
+    def test_checkpoint_counts_file_lines(self):
+        """Test line_number counts blank lines DictReader skips"""
+        self.assertEqual(resumable_insert_data(self.connection, self.path,
+                                               batch_size=3), 10)
+        self.assertEqual(self.checkpoint(),
+                         (os.path.getsize(self.path), self.lines))
+        self.assertEqual(resumable_insert_data(self.connection, self.path,
+                                               batch_size=3), 0)
+
+    def test_dropped_connection_is_reported(self):
+        """Test a lost connection prints the error instead of raising"""
+        dropped = DroppedConnection(self.connection)
+        self.assertEqual(resumable_insert_data(dropped, self.path), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Unit tests for sketches module
+"""
+
+import json
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+from parameterized import parameterized
+from sketches import CountMinSketch, HyperLogLog, TopK, UserSketches
+
+
+def round_trip(sketch):
+    """Rebuilds a sketch from its to_dict state passed through JSON"""
+    return type(sketch).from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """Test cases for HyperLogLog"""
+
+    @parameterized.expand([(10,), (1000,), (50000,)])
+    def test_count(self, distinct):
+        """Test the estimate is within 3% of the distinct count"""
+        sketch = HyperLogLog()
+        for i in range(distinct):
+            sketch.add(f"value{i}")
+            sketch.add(f"value{i}")
+        self.assertAlmostEqual(sketch.count(), distinct,
+                               delta=max(distinct * 0.03, 1))
+
+    def test_merge_equals_single_pass(self):
+        """Test merging partitions gives the registers of one pass"""
+        whole, left, right = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(5000):
+            whole.add(i)
+            (left if i % 3 else right).add(i)
+        self.assertEqual(left.merge(right).registers, whole.registers)
+
+    def test_round_trip(self):
+        """Test to_dict/from_dict keeps the registers"""
+        sketch = HyperLogLog(precision=10)
+        for i in range(300):
+            sketch.add(i)
+        copy = round_trip(sketch)
+        self.assertEqual(copy.registers, sketch.registers)
+        self.assertEqual(copy.count(), sketch.count())
+
+    def test_merge_rejects_other_precision(self):
+        """Test sketches of different precision cannot merge"""
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+
+class TestCountMinSketch(unittest.TestCase):
+    """Test cases for CountMinSketch"""
+
+    def setUp(self):
+        """A skewed stream and its true counts"""
+        rng = random.Random(1)
+        self.values = [int(rng.paretovariate(1.2)) for _ in range(20000)]
+        self.counts = Counter(self.values)
+
+    def test_never_undercounts(self):
+        """Test estimates are at least the true count and within bounds"""
+        sketch = CountMinSketch(width=512, depth=5)
+        for value in self.values:
+            sketch.add(value)
+        bound = 2.72 / sketch.width * sketch.total
+        for value, count in self.counts.items():
+            estimate = sketch.estimate(value)
+            self.assertGreaterEqual(estimate, count)
+            self.assertLessEqual(estimate, count + bound)
+
+    def test_merge_and_round_trip(self):
+        """Test merged and reloaded sketches equal a single pass"""
+        whole = CountMinSketch(256, 4)
+        left, right = CountMinSketch(256, 4), CountMinSketch(256, 4)
+        for i, value in enumerate(self.values):
+            whole.add(value)
+            (left if i % 2 else right).add(value)
+        merged = round_trip(left.merge(right))
+        self.assertEqual(merged.total, whole.total)
+        self.assertEqual(merged.table, whole.table)
+
+    def test_merge_rejects_other_shape(self):
+        """Test sketches of different shape cannot merge"""
+        with self.assertRaises(ValueError):
+            CountMinSketch(256, 4).merge(CountMinSketch(512, 4))
+
+
+class TestTopK(unittest.TestCase):
+    """Test cases for TopK"""
+
+    def test_exact_below_capacity(self):
+        """Test counts are exact while distinct values fit"""
+        top = TopK(k=3, capacity=10)
+        for value in "aaaaabbbbccd":
+            top.add(value)
+        self.assertEqual(top.top(), [('a', 5), ('b', 4), ('c', 2)])
+        self.assertEqual(top.error, 0)
+
+    def test_heavy_value_in_uniform_stream(self):
+        """Test a value above total / (capacity + 1) is always kept"""
+        top = TopK(k=5, capacity=1024)
+        for i in range(200000):
+            top.add("heavy" if i % 600 == 0 else f"u{i}")
+        value, count = top.top(1)[0]
+        self.assertEqual(value, "heavy")
+        self.assertLessEqual(count, 334)
+        self.assertGreaterEqual(count + top.error, 334)
+        self.assertLessEqual(top.error, top.total / (top.capacity + 1))
+
+    def test_merge_and_round_trip(self):
+        """Test a value split across partitions survives the merge"""
+        rng = random.Random(2)
+        parts = [TopK(k=3, capacity=64) for _ in range(4)]
+        for i in range(40000):
+            value = "top" if i % 50 == 0 else f"n{rng.randrange(5000)}"
+            parts[i % 4].add(value)
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(round_trip(part))
+        merged = round_trip(merged)
+        self.assertEqual(merged.total, 40000)
+        self.assertEqual(merged.top(1)[0][0], "top")
+        self.assertLessEqual(len(merged.counters), merged.capacity)
+
+    def test_capacity_below_k(self):
+        """Test capacity must hold at least k values"""
+        with self.assertRaises(ValueError):
+            TopK(k=10, capacity=5)
+
+
+class TestUserSketches(unittest.TestCase):
+    """Test cases for UserSketches"""
+
+    def test_save_and_load(self):
+        """Test merged sketches survive save/load with the same summary"""
+        users = [{'name': f"name{i % 7}", 'email': f"u{i}@d{i % 5}.org",
+                  'age': 20 + i % 50} for i in range(1000)]
+        left, right = UserSketches(k=3), UserSketches(k=3)
+        left.add_batch(users[:400])
+        right.add_batch(users[400:])
+        merged = left.merge(right)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sketches.json")
+            merged.save(path)
+            loaded = UserSketches.load(path)
+        self.assertEqual(loaded.summary(), merged.summary())
+        summary = loaded.summary()
+        self.assertEqual(summary['rows'], 1000)
+        self.assertEqual(summary['distinct_domains'], 5)
+        self.assertEqual(summary['top_names'][0], ('name0', 143))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Unit tests for stream_stats module
+"""
+
+import json
+import random
+import statistics
+import unittest
+from parameterized import parameterized
+from stream_stats import RunningStats, TDigest
+
+
+class TestRunningStats(unittest.TestCase):
+    """Test cases for RunningStats"""
+
+    def setUp(self):
+        """Ages like the synthetic user_data ones"""
+        rng = random.Random(3)
+        self.values = [rng.gauss(38, 16) for _ in range(10000)]
+
+    def test_single_pass(self):
+        """Test count, mean, variance and range against statistics"""
+        stats = RunningStats()
+        for value in self.values:
+            stats.add(value)
+        self.assertEqual(stats.count, len(self.values))
+        self.assertAlmostEqual(stats.mean, statistics.fmean(self.values))
+        self.assertAlmostEqual(stats.variance,
+                               statistics.pvariance(self.values), places=6)
+        self.assertEqual((stats.min, stats.max),
+                         (min(self.values), max(self.values)))
+
+    @parameterized.expand([(0,), (1,), (2500,), (9999,), (10000,)])
+    def test_merge(self, split):
+        """Test merging two parts, either possibly empty, is exact"""
+        whole, left, right = RunningStats(), RunningStats(), RunningStats()
+        for index, value in enumerate(self.values):
+            whole.add(value)
+            (left if index < split else right).add(value)
+        merged = left.merge(right)
+        self.assertEqual(merged.count, whole.count)
+        self.assertAlmostEqual(merged.mean, whole.mean)
+        self.assertAlmostEqual(merged.variance, whole.variance, places=6)
+        self.assertEqual((merged.min, merged.max), (whole.min, whole.max))
+
+
+class TestTDigest(unittest.TestCase):
+    """Test cases for TDigest"""
+
+    def setUp(self):
+        """A skewed sample and its sorted copy"""
+        rng = random.Random(4)
+        self.values = [rng.expovariate(0.05) for _ in range(20000)]
+        self.ordered = sorted(self.values)
+
+    def exact(self, q):
+        """Nearest-rank quantile of the sample"""
+        return self.ordered[min(int(q * len(self.ordered)),
+                                len(self.ordered) - 1)]
+
+    def assert_quantiles(self, digest):
+        """Checks the digest against the exact quantiles"""
+        for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+            self.assertAlmostEqual(digest.quantile(q), self.exact(q),
+                                   delta=0.02 * self.exact(0.99))
+        self.assertEqual(digest.quantile(0), self.ordered[0])
+        self.assertEqual(digest.quantile(1), self.ordered[-1])
+
+    def test_quantiles(self):
+        """Test quantiles of one digest"""
+        digest = TDigest()
+        for value in self.values:
+            digest.add(value)
+        self.assert_quantiles(digest)
+
+    def test_merge_and_round_trip(self):
+        """Test digests merged from JSON round-trips keep their accuracy"""
+        parts = [TDigest() for _ in range(4)]
+        for index, value in enumerate(self.values):
+            parts[index % 4].add(value)
+        merged = TDigest()
+        for part in parts:
+            state = json.loads(json.dumps(part.to_dict()))
+            merged.merge(TDigest.from_dict(state))
+        self.assertEqual(merged.count, len(self.values))
+        self.assert_quantiles(merged)
+        self.assertLessEqual(len(merged.centroids), 2 * merged.compression)
+
+    def test_empty(self):
+        """Test an empty digest has no quantiles and merges as a no-op"""
+        digest = TDigest()
+        self.assertIsNone(digest.quantile(0.5))
+        other = TDigest()
+        other.add(5.0)
+        self.assertEqual(digest.merge(other).quantile(0.5), 5.0)
+        self.assertEqual(other.merge(TDigest()).count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,306 @@
+#!/usr/bin/python3
+"""
+Incrementally maintained statistics over user_data ages
+Running sums and an age histogram are kept up to date so average,
+variance and histogram queries read a few rows instead of scanning the
+table. Triggers on user_data cover ad hoc writers (seed.insert_data,
+LOAD DATA, hand-written SQL); the bulk, parallel and resumable loaders
+switch the triggers off for their session and apply one StatsDelta per
+commit instead.
+"""
+import math
+import sys
+import zlib
+from decimal import Decimal, ROUND_HALF_UP
+from mysql.connector import Error
+from db_pool import connect_to_prodev
+
+# Counters are spread over slots so that concurrent single-row writers
+# rarely update the same row; readers add the slots up. A multi-row
+# transaction touches most slots and holds their locks until it commits,
+# which is why the loaders batch their changes into a StatsDelta.
+STAT_SLOTS = 16
+BUCKET_WIDTH = 10
+
+STATS_TABLES_QUERIES = (
+    """
+    CREATE TABLE IF NOT EXISTS user_stats (
+        slot TINYINT UNSIGNED PRIMARY KEY,
+        row_count BIGINT NOT NULL DEFAULT 0,
+        age_sum DECIMAL(24,2) NOT NULL DEFAULT 0,
+        age_sum_squares DECIMAL(32,4) NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_age_histogram (
+        bucket INT NOT NULL,
+        slot TINYINT UNSIGNED NOT NULL,
+        row_count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, slot)
+    )
+    """,
+)
+
+_SLOT = f"MOD(CRC32({{row}}.user_id), {STAT_SLOTS})"
+_BUCKET = f"FLOOR({{row}}.age / {BUCKET_WIDTH}) * {BUCKET_WIDTH}"
+
+def _apply(row, sign):
+    """Trigger statements adding (+) or removing (-) one row's contribution"""
+    slot = _SLOT.format(row=row)
+    bucket = _BUCKET.format(row=row)
+    return f"""
+        INSERT INTO user_stats (slot, row_count, age_sum, age_sum_squares)
+        VALUES ({slot}, {sign}1, {sign}{row}.age, {sign}{row}.age * {row}.age)
+        ON DUPLICATE KEY UPDATE row_count = row_count {sign} 1,
+            age_sum = age_sum {sign} {row}.age,
+            age_sum_squares = age_sum_squares {sign} {row}.age * {row}.age;
+        INSERT INTO user_age_histogram (bucket, slot, row_count)
+        VALUES ({bucket}, {slot}, {sign}1)
+        ON DUPLICATE KEY UPDATE row_count = row_count {sign} 1;
+    """
+
+TRIGGERS = {
+    'user_data_stats_insert': ("AFTER INSERT", _apply("NEW", "+")),
+    'user_data_stats_delete': ("AFTER DELETE", _apply("OLD", "-")),
+    'user_data_stats_update': ("AFTER UPDATE",
+                               _apply("OLD", "-") + _apply("NEW", "+")),
+}
+
+# Set by loader sessions that maintain the statistics themselves
+DEFER_VARIABLE = "@user_stats_deferred"
+
+STATS_DELTA_QUERY = """
+INSERT INTO user_stats (slot, row_count, age_sum, age_sum_squares)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE row_count = row_count + VALUES(row_count),
+age_sum = age_sum + VALUES(age_sum),
+age_sum_squares = age_sum_squares + VALUES(age_sum_squares)
+"""
+
+HISTOGRAM_DELTA_QUERY = """
+INSERT INTO user_age_histogram (bucket, slot, row_count)
+VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE row_count = row_count + VALUES(row_count)
+"""
+
+_CENTS = Decimal('0.01')
+
+def triggers_installed(cursor):
+    """True if the statistics triggers exist on user_data"""
+    try:
+        cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.triggers
+        WHERE trigger_schema = DATABASE() AND trigger_name = %s
+        """, ('user_data_stats_insert',))
+        return cursor.fetchone()[0] > 0
+    except Error:
+        # No information_schema (e.g. the SQLite stand-in), so no triggers
+        return False
+
+class StatsDelta:
+    """
+    Statistics changes made by a bulk load, applied once per commit
+    begin switches the triggers off for the loader's session. Each chunk
+    is added before it is inserted, and apply, called just before the
+    commit, upserts one row per touched slot and bucket in key order, so
+    concurrent loaders hold the counter locks only while they commit and
+    always take them in the same order. end switches the triggers back
+    on; pooled connections must not keep them off. A user_id that another
+    writer inserts between the lookup and the insert is miscounted;
+    rebuild_stats corrects that drift.
+    """
+
+    def __init__(self, update=False):
+        self.update = update
+        self.totals = {}
+        self.histogram = {}
+
+    @classmethod
+    def begin(cls, cursor, update=False):
+        """
+        StatsDelta for a loader session, or None without the triggers
+        update says whether the load overwrites existing users
+        (on_duplicate='update') or keeps them.
+        """
+        if not triggers_installed(cursor):
+            return None
+        cursor.execute(f"SET {DEFER_VARIABLE} = 1")
+        return cls(update)
+
+    def _add(self, user_id, age, sign):
+        slot = zlib.crc32(user_id.encode()) % STAT_SLOTS
+        totals = self.totals.setdefault(slot, [0, Decimal(0), Decimal(0)])
+        totals[0] += sign
+        totals[1] += sign * age
+        totals[2] += sign * age * age
+        key = (math.floor(age / BUCKET_WIDTH) * BUCKET_WIDTH, slot)
+        self.histogram[key] = self.histogram.get(key, 0) + sign
+
+    def add_chunk(self, cursor, chunk):
+        """
+        Records the changes inserting chunk is about to make
+        Looks up the ages already stored under the chunk's ids, then
+        replays INSERT IGNORE (first row per id wins) or the upsert
+        (last row wins, replacing the stored age).
+        """
+        ids = list({row[0] for row in chunk})
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute("SELECT user_id, age FROM user_data "
+                       f"WHERE user_id IN ({placeholders})", ids)
+        current = {user_id: Decimal(age) for user_id, age in cursor.fetchall()}
+        for user_id, _, _, age in chunk:
+            # Stored as DECIMAL(5,2)
+            age = Decimal(str(age)).quantize(_CENTS, ROUND_HALF_UP)
+            if user_id in current:
+                if not self.update:
+                    continue
+                self._add(user_id, current[user_id], -1)
+            self._add(user_id, age, 1)
+            current[user_id] = age
+
+    def apply(self, cursor):
+        """Upserts the pending changes; call right before committing"""
+        totals = [(slot, count, total, squares)
+                  for slot, (count, total, squares) in sorted(
+                      self.totals.items()) if count or total or squares]
+        histogram = [(bucket, slot, count)
+                     for (bucket, slot), count in sorted(
+                         self.histogram.items()) if count]
+        if totals:
+            cursor.executemany(STATS_DELTA_QUERY, totals)
+        if histogram:
+            cursor.executemany(HISTOGRAM_DELTA_QUERY, histogram)
+        self.totals = {}
+        self.histogram = {}
+
+    def end(self, cursor):
+        """Switches the triggers back on for this session"""
+        try:
+            cursor.execute(f"SET {DEFER_VARIABLE} = NULL")
+        except Error:
+            # Only fails on a broken connection, which is not reused
+            pass
+
+def create_stats_tables(connection):
+    """
+    Creates the statistics tables and the user_data triggers
+    Tables created empty next to an existing user_data are filled once
+    with rebuild_stats.
+    """
+    try:
+        cursor = connection.cursor()
+        for query in STATS_TABLES_QUERIES:
+            cursor.execute(query)
+        for name, (timing, body) in TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"CREATE TRIGGER {name} {timing} ON user_data "
+                           f"FOR EACH ROW BEGIN IF {DEFER_VARIABLE} IS NULL "
+                           f"THEN {body} END IF; END")
+        cursor.execute("SELECT COUNT(*) FROM user_stats")
+        empty = cursor.fetchone()[0] == 0
+        cursor.close()
+        connection.commit()
+        print("Statistics tables and triggers created")
+    except Error as e:
+        print(f"Error creating statistics tables: {e}")
+        return
+    if empty:
+        rebuild_stats(connection)
+
+def rebuild_stats(connection):
+    """
+    Recomputes the statistics tables from user_data
+    For recovering from drift (e.g. rows written while the triggers were
+    missing, or the same new user_id loaded by two loaders at once).
+    Runs in one transaction; writers that commit while it runs can still
+    be missed, so run it when user_data is quiet.
+    """
+    slot = _SLOT.format(row="user_data")
+    bucket = _BUCKET.format(row="user_data")
+    try:
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM user_stats")
+        cursor.execute("DELETE FROM user_age_histogram")
+        cursor.execute(f"""
+        INSERT INTO user_stats (slot, row_count, age_sum, age_sum_squares)
+        SELECT {slot}, COUNT(*), SUM(age), SUM(age * age)
+        FROM user_data GROUP BY 1
+        """)
+        cursor.execute(f"""
+        INSERT INTO user_age_histogram (bucket, slot, row_count)
+        SELECT {bucket}, {slot}, COUNT(*) FROM user_data GROUP BY 1, 2
+        """)
+        connection.commit()
+        cursor.close()
+        print("User statistics rebuilt")
+    except Error as e:
+        connection.rollback()
+        print(f"Error rebuilding statistics: {e}")
+
+def get_stats():
+    """
+    Count, average, variance and age histogram from the statistics tables
+    Reads at most STAT_SLOTS rows plus one per histogram bucket, whatever
+    the size of user_data. The histogram maps each bucket's lower age
+    bound to its count.
+    """
+    connection = connect_to_prodev()
+    if not connection:
+        return None
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COALESCE(SUM(row_count), 0), "
+                       "COALESCE(SUM(age_sum), 0), "
+                       "COALESCE(SUM(age_sum_squares), 0) FROM user_stats")
+        count, total, squares = cursor.fetchone()
+        cursor.execute("SELECT bucket, SUM(row_count) FROM user_age_histogram "
+                       "GROUP BY bucket HAVING SUM(row_count) > 0 "
+                       "ORDER BY bucket")
+        histogram = {int(bucket): int(rows)
+                     for bucket, rows in cursor.fetchall()}
+    except Error as e:
+        print(f"Error reading statistics: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        connection.close()
+
+    count = int(count)
+    if not count:
+        return {'count': 0, 'average': None, 'variance': None,
+                'histogram': histogram}
+    mean = Decimal(total) / count
+    variance = Decimal(squares) / count - mean * mean
+    return {
+        'count': count,
+        'average': float(mean),
+        'variance': float(variance),
+        'histogram': histogram,
+    }
+
+def average_age():
+    """Average user age in O(1)"""
+    stats = get_stats()
+    return stats['average'] if stats else None
+
+def age_variance():
+    """Population variance of user ages in O(1)"""
+    stats = get_stats()
+    return stats['variance'] if stats else None
+
+def age_histogram():
+    """Users per BUCKET_WIDTH-year age bucket in O(1)"""
+    stats = get_stats()
+    return stats['histogram'] if stats else None
+
+if __name__ == "__main__":
+    # ./user_stats.py [--rebuild]
+    if '--rebuild' in sys.argv:
+        connection = connect_to_prodev()
+        if connection:
+            rebuild_stats(connection)
+            connection.close()
+    print(get_stats())